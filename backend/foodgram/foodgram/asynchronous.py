@@ -0,0 +1,127 @@
+import asyncio
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Page
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.exceptions import (
+    AuthenticationFailed, NotAuthenticated, NotFound,
+)
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .profiling import run_traced
+from .renderers import FastJSONRenderer
+from users.pagination import LimitPageNumberPagination
+
+
+def _closing(func):
+    @wraps(func)
+    def inner(*args, **kwargs):
+        try:
+            return run_traced(func, *args, **kwargs)
+        finally:
+            close_old_connections()
+    return inner
+
+
+def run_in_thread(func, *args, **kwargs):
+    return sync_to_async(
+        _closing(func), thread_sensitive=False)(*args, **kwargs)
+
+
+async def gather(*funcs):
+    return await asyncio.gather(*(run_in_thread(func) for func in funcs))
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status,
+        content_type='application/json')
+
+
+def get_api_request(request):
+    return Request(
+        request,
+        authenticators=[
+            auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+
+
+def get_authenticate_header(request):
+    if request.authenticators:
+        return request.authenticators[0].authenticate_header(request)
+    return None
+
+
+def handle_exception(request, exc, args, kwargs):
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        auth_header = get_authenticate_header(request)
+        if auth_header:
+            exc.auth_header = auth_header
+        else:
+            exc.status_code = 403
+    context = {'view': None, 'args': args, 'kwargs': kwargs,
+               'request': request}
+    response = api_settings.EXCEPTION_HANDLER(exc, context)
+    if response is None:
+        raise exc
+    result = json_response(response.data, response.status_code)
+    for header, value in response.items():
+        if header.lower() != 'content-type':
+            result[header] = value
+    return result
+
+
+def read_only_view(fallback, require_auth=False):
+    def decorator(view):
+        sync_fallback = sync_to_async(fallback)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_fallback(request, *args, **kwargs)
+            api_request = get_api_request(request)
+            try:
+                user = await run_in_thread(lambda: api_request.user)
+                if require_auth and not user.is_authenticated:
+                    raise NotAuthenticated
+                return await view(api_request, *args, **kwargs)
+            except Exception as exc:
+                return handle_exception(api_request, exc, args, kwargs)
+
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+async def paginate(request, queryset, view=None):
+    pagination = LimitPageNumberPagination()
+    count_strategy = getattr(view, 'pagination_count_strategy', None)
+    if count_strategy is not None and count_strategy.counts:
+        pagination.count_strategy = count_strategy
+    page_size = pagination.get_page_size(request)
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    number = request.query_params.get(pagination.page_query_param, 1)
+    try:
+        if number in pagination.last_page_strings:
+            await run_in_thread(lambda: paginator.count)
+            number = paginator.num_pages
+        number = int(number)
+        if number < 1:
+            raise InvalidPage
+        bottom = (number - 1) * page_size
+        page_queryset = queryset[bottom:bottom + page_size]
+        _, objects = await gather(
+            lambda: paginator.count, lambda: list(page_queryset))
+        paginator.validate_number(number)
+    except (InvalidPage, TypeError, ValueError):
+        raise NotFound(pagination.invalid_page_message)
+    pagination.page = Page(objects, number, paginator)
+    pagination.request = request
+    return pagination, objects
+
+
+def paginated_response(pagination, data):
+    return json_response(pagination.get_paginated_response(data).data)
@@ -0,0 +1,128 @@
+from collections import Counter
+
+from django.db import connections, models, transaction
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.dispatch import Signal
+
+pre_bulk_delete = Signal()
+post_bulk_delete = Signal()
+
+
+def get_relations(model):
+    return [
+        relation
+        for relation in get_candidate_relations_to_delete(model._meta)
+        if relation.on_delete is not models.DO_NOTHING]
+
+
+def is_set_based(model, seen=frozenset()):
+    if model in seen:
+        return False
+    for relation in get_relations(model):
+        if relation.on_delete is models.SET_NULL:
+            continue
+        if relation.on_delete is not models.CASCADE:
+            return False
+        if not is_set_based(relation.related_model, seen | {model}):
+            return False
+    return True
+
+
+def get_related(relation, queryset):
+    return relation.related_model._base_manager.using(queryset.db).filter(
+        **{f'{relation.field.name}__in': queryset})
+
+
+def delete_rows(queryset):
+    opts = queryset.model._meta
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    sql, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(opts.db_table)} '
+            f'WHERE {quote(opts.pk.column)} IN ({sql})', params)
+        return cursor.rowcount
+
+
+def cascade(queryset, deleted):
+    model = queryset.model
+    pre_bulk_delete.send(sender=model, queryset=queryset)
+    for relation in get_relations(model):
+        related = get_related(relation, queryset)
+        if relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+        else:
+            cascade(related, deleted)
+    count = delete_rows(queryset)
+    if count:
+        deleted[model] += count
+
+
+def count_cascade(queryset, counts=None):
+    counts = Counter() if counts is None else counts
+    counts[queryset.model] += queryset.count()
+    for relation in get_relations(queryset.model):
+        if relation.on_delete is models.CASCADE:
+            count_cascade(get_related(relation, queryset), counts)
+    return counts
+
+
+def bulk_delete(queryset, batch_size=1000):
+    model = queryset.model
+    if not is_set_based(model):
+        return queryset.delete()
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    deleted = Counter()
+    while True:
+        batch = list(pks[:batch_size])
+        if not batch:
+            break
+        chunk = Counter()
+        with transaction.atomic(using=queryset.db):
+            cascade(model._base_manager.using(queryset.db).filter(
+                pk__in=batch), chunk)
+        for related_model, count in chunk.items():
+            post_bulk_delete.send(sender=related_model, count=count)
+        deleted.update(chunk)
+        if len(batch) < batch_size:
+            break
+    return sum(deleted.values()), {
+        related_model._meta.label: count
+        for related_model, count in deleted.items()}
+
+
+class BulkDeletionAdminMixin:
+    deleted_objects_limit = 100
+
+    def bulk_delete(self, queryset):
+        return bulk_delete(queryset)
+
+    def delete_model(self, request, obj):
+        self.bulk_delete(self.model._base_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.bulk_delete(queryset)
+
+    def get_deleted_objects(self, objs, request):
+        if not isinstance(objs, models.QuerySet):
+            objs = self.model._base_manager.filter(
+                pk__in=[obj.pk for obj in objs])
+        counts = count_cascade(objs)
+        model_count = {}
+        perms_needed = set()
+        for model, count in counts.items():
+            if not count:
+                continue
+            opts = model._meta
+            model_count[opts.verbose_name_plural] = count
+            model_admin = self.admin_site._registry.get(model)
+            if (model_admin is not None
+                    and not model_admin.has_delete_permission(request)):
+                perms_needed.add(opts.verbose_name)
+        deleted_objects = [
+            str(obj) for obj in objs[:self.deleted_objects_limit]]
+        hidden = counts[self.model] - len(deleted_objects)
+        if hidden > 0:
+            deleted_objects.append(f'… и еще {hidden}')
+        return deleted_objects, model_count, perms_needed, []
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import logging
+import os
+
+from functools import lru_cache
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+KEY_HEADER = 'Surrogate-Key'
+CACHE_KEY_HEADER = 'X-Cache-Key'
+CACHE_HEADER_SIZE = 16 * 1024
+CACHE_LEVELS = (1, 2)
+
+
+def get_key(model, pk=None):
+    name = model._meta.model_name
+    return name if pk is None else f'{name}-{pk}'
+
+
+def add_keys(request, *keys):
+    request = getattr(request, '_request', request)
+    if not hasattr(request, 'surrogate_keys'):
+        request.surrogate_keys = set()
+    request.surrogate_keys.update(keys)
+
+
+class SurrogateKeyMixin:
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        add_keys(request, get_key(self.queryset.model))
+
+
+def is_cacheable(request, response):
+    return (
+        settings.GATEWAY_CACHE['TIMEOUT'] > 0
+        and getattr(request, 'surrogate_keys', None)
+        and request.method in ('GET', 'HEAD')
+        and response.status_code == 200
+        and not response.has_header('Set-Cookie')
+        and not request.user.is_authenticated)
+
+
+class SurrogateKeyMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(
+            request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if is_cacheable(request, response):
+            timeout = settings.GATEWAY_CACHE['TIMEOUT']
+            response[KEY_HEADER] = ' '.join(sorted(request.surrogate_keys))
+            response['Surrogate-Control'] = f'max-age={timeout}'
+            response['X-Accel-Expires'] = str(timeout)
+            register(request, request.surrogate_keys)
+        return response
+
+
+class BasePurgeClient:
+
+    def __init__(self, options):
+        self.options = options
+
+    def register(self, request, keys):
+        pass
+
+    def purge(self, keys):
+        raise NotImplementedError
+
+
+class HTTPPurgeClient(BasePurgeClient):
+
+    def purge(self, keys):
+        request = Request(
+            self.options['PURGE_URL'], method='PURGE',
+            headers={KEY_HEADER: ' '.join(sorted(keys))})
+        with urlopen(request, timeout=self.options['PURGE_TIMEOUT']):
+            pass
+
+
+class NginxPurgeClient(BasePurgeClient):
+
+    @staticmethod
+    def get_file_name(cache_key):
+        name = hashlib.md5(cache_key.encode()).hexdigest()
+        parts = []
+        end = len(name)
+        for level in CACHE_LEVELS:
+            parts.append(name[end - level:end])
+            end -= level
+        return os.path.join(*parts, name)
+
+    def get_index_path(self, key):
+        return os.path.join(self.options['INDEX_PATH'], key)
+
+    def register(self, request, keys):
+        cache_key = request.headers.get(CACHE_KEY_HEADER)
+        if not cache_key:
+            return
+        entry = self.get_file_name(cache_key).replace(os.sep, '-')
+        for key in keys:
+            path = self.get_index_path(key)
+            os.makedirs(path, exist_ok=True)
+            open(os.path.join(path, entry), 'a').close()
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def purge(self, keys):
+        for key in keys:
+            try:
+                entries = list(os.scandir(self.get_index_path(key)))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                self.remove(os.path.join(
+                    self.options['CACHE_PATH'],
+                    *entry.name.split('-')))
+                self.remove(entry.path)
+
+    def read_keys(self, path):
+        try:
+            with open(path, 'rb') as file:
+                head = file.read(CACHE_HEADER_SIZE)
+        except FileNotFoundError:
+            return set()
+        header = f'\r\n{KEY_HEADER}:'.lower().encode()
+        start = head.lower().find(header)
+        if start == -1:
+            return set()
+        start += len(header)
+        return set(head[start:head.find(b'\r\n', start)].decode().split())
+
+    def scan(self, keys):
+        keys = set(keys)
+        removed = 0
+        for directory, _, names in os.walk(self.options['CACHE_PATH']):
+            for name in names:
+                path = os.path.join(directory, name)
+                if self.read_keys(path) & keys:
+                    self.remove(path)
+                    removed += 1
+        return removed
+
+
+class MemoryPurgeClient(BasePurgeClient):
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.purged = []
+
+    def purge(self, keys):
+        self.purged.append(set(keys))
+
+
+@lru_cache(maxsize=None)
+def get_purge_client():
+    options = settings.GATEWAY_CACHE
+    if not options['PURGE_CLIENT']:
+        return None
+    return import_string(options['PURGE_CLIENT'])(options)
+
+
+def register(request, keys):
+    client = get_purge_client()
+    if client is None:
+        return
+    try:
+        client.register(request, keys)
+    except OSError:
+        logger.exception('Не удалось записать ключи кэша шлюза: %s', keys)
+
+
+def send_purge(client, keys):
+    try:
+        client.purge(keys)
+    except Exception:
+        logger.exception('Не удалось сбросить кэш шлюза: %s', keys)
+
+
+def purge(*keys):
+    client = get_purge_client()
+    if client is not None and keys:
+        keys = set(keys)
+        transaction.on_commit(lambda: send_purge(client, keys))
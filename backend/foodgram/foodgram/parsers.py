@@ -0,0 +1,31 @@
+import json
+
+from django.utils.datastructures import MultiValueDict
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+class SingleValueFiles(MultiValueDict):
+
+    def __iter__(self):
+        return iter(self.keys())
+
+
+class MultiPartJSONParser(MultiPartParser):
+    json_part = 'data'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        fields = parsed.data.dict()
+        payload = fields.pop(self.json_part, None)
+        if payload is not None:
+            try:
+                payload = json.loads(payload)
+            except ValueError as exc:
+                raise ParseError(
+                    f'Некорректный JSON в части {self.json_part}: {exc}')
+            if not isinstance(payload, dict):
+                raise ParseError(
+                    f'Часть {self.json_part} должна быть JSON-объектом.')
+            fields.update(payload)
+        return DataAndFiles(fields, SingleValueFiles(parsed.files.lists()))
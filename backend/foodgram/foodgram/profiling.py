@@ -0,0 +1,296 @@
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import signal
+import sys
+import threading
+import time
+
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from functools import lru_cache, partial
+from hmac import compare_digest
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'X-Profile'
+ID_HEADER = 'X-Profile-Id'
+STACKS_SUFFIX = '.collapsed'
+META_SUFFIX = '.json'
+MAX_DEPTH = 128
+MIN_TIME = 1e-5
+
+lock = threading.Lock()
+current_session = ContextVar('profiling_session', default=None)
+
+
+@lru_cache(maxsize=4096)
+def get_label(filename, lineno, name):
+    if filename == '~':
+        return name
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and filename.startswith(path + os.sep):
+            filename = filename[len(path) + 1:]
+            break
+    return f'{name} ({filename}:{lineno})'
+
+
+def call(func, *args):
+    return func(*args)
+
+
+def get_code_key(code):
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class SamplingProfiler:
+    name = 'sampling'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+
+    @staticmethod
+    def get_unavailable_reason():
+        if not hasattr(signal, 'setitimer'):
+            return 'нет signal.setitimer'
+        if threading.current_thread() is not threading.main_thread():
+            return 'запрос обрабатывается не в основном потоке'
+        return None
+
+    def sample(self, signum, frame):
+        stack = []
+        while frame is not None and frame.f_code is not call.__code__:
+            stack.append(get_label(*get_code_key(frame.f_code)))
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def run(self, func, *args):
+        previous = signal.signal(signal.SIGALRM, self.sample)
+        signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        try:
+            return call(func, *args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    def get_stacks(self):
+        weight = round(self.interval * 1e6)
+        return {
+            stack: count * weight
+            for stack, count in self.samples.items() if stack}
+
+
+class TracingProfiler:
+    name = 'cprofile'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def run(self, func, *args):
+        self.profile.enable()
+        try:
+            return call(func, *args)
+        finally:
+            self.profile.disable()
+
+    def get_stacks(self):
+        stats = pstats.Stats(self.profile).stats
+        children = defaultdict(list)
+        for func, (*_, callers) in stats.items():
+            for caller, (*_, cumulative) in callers.items():
+                children[caller].append((func, cumulative))
+        stacks = Counter()
+
+        def walk(func, path, spent):
+            _, _, own, cumulative, _ = stats[func]
+            if (cumulative <= 0 or spent < MIN_TIME
+                    or len(path) >= MAX_DEPTH):
+                return
+            share = min(spent / cumulative, 1)
+            path = (*path, get_label(*func))
+            stacks[';'.join(path)] += own * share * 1e6
+            for child, child_spent in children[func]:
+                if get_label(*child) not in path:
+                    walk(child, path, child_spent * share)
+
+        for func, spent in children[get_code_key(call.__code__)]:
+            walk(func, (), spent)
+        return {
+            stack: round(weight)
+            for stack, weight in stacks.items() if round(weight)}
+
+
+class Session:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stacks = Counter()
+        self.queries = 0
+
+    def run(self, func):
+        profiler = TracingProfiler()
+        with CaptureQueriesContext(connection) as queries:
+            try:
+                return profiler.run(func)
+            finally:
+                stacks = profiler.get_stacks()
+                with self.lock:
+                    self.stacks.update(stacks)
+                    self.queries += len(queries)
+
+
+def run_traced(func, *args, **kwargs):
+    session = current_session.get()
+    if session is None:
+        return func(*args, **kwargs)
+    return session.run(partial(func, *args, **kwargs))
+
+
+def is_enabled():
+    options = settings.PROFILING
+    return bool(options['TOKEN']) or options['SAMPLE_RATE'] > 0
+
+
+def get_trigger(request):
+    options = settings.PROFILING
+    token = request.headers.get(HEADER)
+    if token and options['TOKEN'] and compare_digest(token, options['TOKEN']):
+        return 'header'
+    if random.random() < options['SAMPLE_RATE']:
+        return 'sample'
+    return None
+
+
+@lru_cache(maxsize=None)
+def warn_fallback(reason):
+    logger.warning(
+        'Сэмплирующий профилировщик недоступен (%s), используется cProfile',
+        reason)
+
+
+def get_profiler():
+    options = settings.PROFILING
+    if options['PROFILER'] != SamplingProfiler.name:
+        return TracingProfiler(), None
+    reason = SamplingProfiler.get_unavailable_reason()
+    if reason is None:
+        return SamplingProfiler(options['INTERVAL']), None
+    warn_fallback(reason)
+    return TracingProfiler(), reason
+
+
+def get_user(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return {'id': user.id, 'username': user.username}
+
+
+def write_stacks(path, stacks):
+    with open(path, 'w') as file:
+        for stack, weight in sorted(stacks.items()):
+            file.write(f'{stack} {weight}\n')
+
+
+def save(name, stacks, meta):
+    path = settings.PROFILING['PATH']
+    os.makedirs(path, exist_ok=True)
+    write_stacks(os.path.join(path, name + STACKS_SUFFIX), stacks)
+    with open(os.path.join(path, name + META_SUFFIX), 'w') as file:
+        json.dump(meta, file, ensure_ascii=False, indent=2)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        trigger = get_trigger(request)
+        if trigger is None or not lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request, trigger, self.get_response)
+        finally:
+            lock.release()
+
+    async def __acall__(self, request):
+        trigger = get_trigger(request)
+        if trigger is None or not lock.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            return await sync_to_async(self.profile)(
+                request, trigger, async_to_sync(self.get_response))
+        finally:
+            lock.release()
+
+    def profile(self, request, trigger, get_response):
+        profiler, fallback = get_profiler()
+        session = Session()
+        token = current_session.set(session)
+        started = timezone.now()
+        start = time.perf_counter()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = profiler.run(get_response, request)
+        finally:
+            current_session.reset(token)
+        duration = time.perf_counter() - start
+        stacks = session.stacks + Counter(profiler.get_stacks())
+        match = request.resolver_match
+        name = f'{started:%Y%m%d-%H%M%S-%f}-{os.getpid()}'
+        meta = {
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration': round(duration * 1000, 3),
+            'queries': len(queries) + session.queries,
+            'user': get_user(request),
+            'profiler': profiler.name,
+            'fallback': fallback,
+            'trigger': trigger,
+            'created': started.isoformat(),
+        }
+        try:
+            save(name, stacks, meta)
+        except Exception:
+            logger.exception('Не удалось сохранить профиль запроса %s', name)
+        else:
+            response[ID_HEADER] = name
+        return response
+
+
+def load(path):
+    for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+        if not entry.name.endswith(META_SUFFIX):
+            continue
+        with open(entry.path) as file:
+            meta = json.load(file)
+        stacks = Counter()
+        stacks_path = entry.path[:-len(META_SUFFIX)] + STACKS_SUFFIX
+        with open(stacks_path) as file:
+            for line in file:
+                stack, _, weight = line.rstrip('\n').rpartition(' ')
+                stacks[stack] += int(weight)
+        yield meta, stacks
@@ -0,0 +1,164 @@
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+
+from django.conf import settings
+from django.db.models import Manager, QuerySet
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+IDENTITY_REPRESENTATIONS = {
+    serializers.BooleanField.to_representation,
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.ReadOnlyField.to_representation,
+}
+
+
+def get_instance(instance):
+    return instance
+
+
+def get_getter(field, rows):
+    if field.source == '*':
+        return get_instance
+    if rows:
+        return itemgetter('__'.join(field.source_attrs))
+    return attrgetter('.'.join(field.source_attrs))
+
+
+def represent_many(represent):
+    def inner(value):
+        if isinstance(value, Manager):
+            value = value.all()
+        return [represent(item) for item in value]
+    return inner
+
+
+def represent_file(field):
+    request = field.context.get('request')
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+
+    def inner(value):
+        if not value:
+            return None
+        if not use_url:
+            return value.name
+        try:
+            url = value.url
+        except AttributeError:
+            return None
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+    return inner
+
+
+def represent_generic(field):
+    def inner(instance):
+        value = field.get_attribute(instance)
+        check_for_none = (
+            value.pk if isinstance(value, PKOnlyObject) else value)
+        if check_for_none is None:
+            return None
+        return field.to_representation(value)
+    return inner
+
+
+def compile_field(field, rows=False):
+    representation = type(field).to_representation
+    if isinstance(field, serializers.ListSerializer):
+        return (get_getter(field, rows),
+                represent_many(CompiledRepresentation(field.child)))
+    if isinstance(field, serializers.Serializer):
+        return get_getter(field, rows), CompiledRepresentation(field)
+    if isinstance(field, serializers.SerializerMethodField):
+        return get_getter(field, rows), getattr(
+            field.parent, field.method_name)
+    if representation in IDENTITY_REPRESENTATIONS:
+        return get_getter(field, rows), None
+    if (isinstance(field, serializers.FileField)
+            and representation is serializers.FileField.to_representation):
+        return get_getter(field, rows), represent_file(field)
+    return None, represent_generic(field)
+
+
+class CompiledRepresentation:
+
+    def __init__(self, serializer, rows=False):
+        self.fields = []
+        self.sources = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            getter, converter = compile_field(field, rows)
+            self.fields.append((field.field_name, getter, converter))
+            if field.source_attrs:
+                self.sources.append('__'.join(field.source_attrs))
+
+    def __call__(self, instance):
+        ret = {}
+        for name, getter, converter in self.fields:
+            if getter is None:
+                try:
+                    ret[name] = converter(instance)
+                except SkipField:
+                    pass
+                continue
+            value = getter(instance)
+            if value is None or converter is None:
+                ret[name] = value
+            else:
+                ret[name] = converter(value)
+        return ret
+
+    def many(self, instances):
+        return [self(instance) for instance in instances]
+
+
+class CompiledSerializer:
+
+    def __init__(self, serializer, rows=False):
+        self.many = isinstance(serializer, serializers.ListSerializer)
+        self.instance = serializer.instance
+        self.rows = rows and self.many
+        self.representation = CompiledRepresentation(
+            serializer.child if self.many else serializer, self.rows)
+
+    @property
+    def data(self):
+        instance = self.instance
+        if not self.many:
+            return self.representation(instance)
+        if self.rows and isinstance(instance, QuerySet):
+            instance = instance.values(*self.representation.sources)
+        return self.representation.many(instance)
+
+
+@lru_cache(maxsize=None)
+def compiled(serializer_class):
+    return CompiledRepresentation(serializer_class())
+
+
+def serialize_many(serializer_class, instances):
+    if not settings.COMPILED_SERIALIZERS:
+        return serializer_class(instances, many=True).data
+    return compiled(serializer_class).many(instances)
+
+
+def compile_serializer(serializer, rows=False):
+    if not settings.COMPILED_SERIALIZERS:
+        return serializer
+    return CompiledSerializer(serializer, rows)
+
+
+class CompiledSerializerMixin:
+    compiled_actions = ('list', 'retrieve')
+    compiled_rows = False
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.action not in self.compiled_actions:
+            return serializer
+        return compile_serializer(serializer, self.compiled_rows)
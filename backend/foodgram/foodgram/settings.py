@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,6 +38,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.gateway_cache.SurrogateKeyMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -66,7 +68,16 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 0)),
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -114,13 +125,104 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachingTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'foodgram.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'SEARCH_PARAM': 'name',
     'DEFAULT_PAGINATION_CLASS': 'users.pagination.LimitPageNumberPagination',
     'PAGE_SIZE': 6,
 }
 
+THROTTLE_BUCKETS = {
+    'BACKEND': os.getenv(
+        'THROTTLE_BACKEND', 'recipes.throttling.MemoryBucketBackend'),
+    'RATES': {
+        'toggle': (30, 1),
+        'recipe_write': (10, 0.1),
+    },
+    'CACHE': os.getenv('THROTTLE_CACHE', 'default'),
+    'WORKERS': int(os.getenv('WEB_CONCURRENCY', 1)),
+}
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.getenv('TOKEN_AUTH_CACHE_MAX_SIZE', 10000)),
+    'TIMEOUT': int(os.getenv('TOKEN_AUTH_CACHE_TIMEOUT', 60)),
+    'SHARED_CACHE': os.getenv('TOKEN_AUTH_SHARED_CACHE', ''),
+    'SHARED_TIMEOUT': int(os.getenv('TOKEN_AUTH_SHARED_TIMEOUT', 300)),
+    'WORKERS': int(os.getenv('WEB_CONCURRENCY', 1)),
+}
+
+CACHED_COUNT = {
+    'CACHE': os.getenv('CACHED_COUNT_CACHE', 'default'),
+    'WORKERS': int(os.getenv('WEB_CONCURRENCY', 1)),
+}
+
+ASYNC_READ_API = os.getenv('ASYNC_READ_API', 'false').lower() == 'true'
+
+COMPILED_SERIALIZERS = os.getenv(
+    'COMPILED_SERIALIZERS', 'true').lower() == 'true'
+
+RECIPE_RANKINGS = {
+    'POPULAR_HALF_LIFE': 30 * 24 * 60 * 60,
+    'TRENDING_HALF_LIFE': 24 * 60 * 60,
+    'WEIGHTS': {
+        'favorite': 1.0,
+        'shoppingcart': 0.5,
+    },
+}
+
+SIMILARITY = {
+    'PATH': os.getenv('SIMILARITY_PATH', BASE_DIR / 'similarity'),
+    'TOP_K': 20,
+    'TAG_WEIGHT': 0.5,
+    'BATCH_SIZE': 1024,
+    'BATCH_NNZ': 10_000_000,
+    'FAVORITES_LIMIT': 50,
+}
+
+SHOPPING_LIST_JOBS = {
+    'BACKEND': os.getenv('SHOPPING_LIST_JOBS_BACKEND', ''),
+    'WORKERS': int(os.getenv('SHOPPING_LIST_JOBS_WORKERS', 2)),
+    'TIMEOUT': int(os.getenv('SHOPPING_LIST_JOBS_TIMEOUT', 300)),
+    'TTL': int(os.getenv('SHOPPING_LIST_JOBS_TTL', 3600)),
+}
+
+DELETION = {
+    'SOFT': os.getenv('SOFT_DELETE', 'false').lower() == 'true',
+    'BATCH_SIZE': int(os.getenv('DELETION_BATCH_SIZE', 500)),
+}
+
+MEDIA_CLEANUP = {
+    'ON_WRITE': os.getenv('MEDIA_CLEANUP_ON_WRITE', 'false').lower() == 'true',
+    'GRACE_PERIOD': 24 * 60 * 60,
+    'BATCH_SIZE': 1000,
+}
+
+GATEWAY_CACHE = {
+    'TIMEOUT': int(os.getenv('GATEWAY_CACHE_TIMEOUT', 60)),
+    'PURGE_CLIENT': os.getenv('GATEWAY_CACHE_PURGE_CLIENT', ''),
+    'PURGE_URL': os.getenv('GATEWAY_CACHE_PURGE_URL', ''),
+    'PURGE_TIMEOUT': 2,
+    'CACHE_PATH': os.getenv('GATEWAY_CACHE_PATH', '/gateway_cache'),
+    'INDEX_PATH': os.getenv(
+        'GATEWAY_CACHE_INDEX_PATH', '/gateway_cache_index'),
+}
+
+RECIPE_SYNC = {
+    'PAGE_SIZE': 500,
+}
+
+PROFILING = {
+    'TOKEN': os.getenv('PROFILING_TOKEN', ''),
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', 0)),
+    'PROFILER': os.getenv('PROFILING_PROFILER', 'sampling'),
+    'INTERVAL': 0.005,
+    'PATH': os.getenv('PROFILING_PATH', BASE_DIR / 'profiles'),
+}
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {
@@ -1,14 +1,21 @@
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from foodgram.deletion import BulkDeletionAdminMixin
 
+from .admin_filters import AutocompleteFilter, AutocompleteFilterMixin
+from .deletion import delete_recipes
 from .models import (
-    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart, Tag,
-    TagRecipe,
+    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart,
+    ShoppingListJob, Tag, TagRecipe,
 )
+from users.pagination import EstimatedCountPaginator
 
 
 class IngredientRecipeInline(admin.TabularInline):
     model = IngredientRecipe
     min_num = 1
+    raw_id_fields = ('ingredient',)
 
 
 class TagRecipeInLine(admin.TabularInline):
@@ -24,42 +31,84 @@ class TagAdmin(admin.ModelAdmin):
 
 
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'measurement_unit')
+    list_display = ('id', 'name', 'measurement_unit', 'calories', 'price')
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(
+        BulkDeletionAdminMixin, AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'is_favorite')
+    list_select_related = ('author',)
     readonly_fields = ('is_favorite',)
-    list_filter = ('name', 'author', 'tags')
+    search_fields = ('name',)
+    list_filter = (AutocompleteFilter.for_field('author'), 'tags')
     empty_value_display = '-пусто-'
+    ordering = ('-pub_date',)
     inlines = (IngredientRecipeInline, TagRecipeInLine)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorite_count=Coalesce(Subquery(
+                Favorite.objects.filter(recipe=OuterRef('pk')).values(
+                    'recipe').annotate(count=Count('id')).values('count')),
+                0))
 
     def is_favorite(self, obj):
-        return obj.favorite.all().count()
+        return obj.favorite_count
 
     is_favorite.short_description = 'Добавлено в избранное, раз'
+    is_favorite.admin_order_field = 'favorite_count'
+
+    def bulk_delete(self, queryset):
+        return delete_recipes(queryset)
 
 
-class TagRecipeAdmin(admin.ModelAdmin):
+class RecipeRelationAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class TagRecipeAdmin(RecipeRelationAdmin):
     list_display = ('id', 'tag', 'recipe')
-    list_filter = ('tag', 'recipe')
+    list_select_related = ('tag', 'recipe')
+    list_filter = ('tag', AutocompleteFilter.for_field('recipe'))
+    autocomplete_fields = ('recipe',)
 
 
-class IngredientRecipeAdmin(admin.ModelAdmin):
+class IngredientRecipeAdmin(RecipeRelationAdmin):
     list_display = ('id', 'ingredient', 'recipe', 'amount')
-    list_filter = ('ingredient', 'recipe')
+    list_select_related = ('ingredient', 'recipe')
+    list_filter = (AutocompleteFilter.for_field('ingredient'),
+                   AutocompleteFilter.for_field('recipe'))
+    autocomplete_fields = ('ingredient', 'recipe')
 
 
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(RecipeRelationAdmin):
     list_display = ('id', 'user', 'recipe')
-    list_filter = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    list_filter = (AutocompleteFilter.for_field('user'),
+                   AutocompleteFilter.for_field('recipe'))
+    autocomplete_fields = ('user', 'recipe')
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(RecipeRelationAdmin):
     list_display = ('id', 'user', 'recipe')
-    list_filter = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    list_filter = (AutocompleteFilter.for_field('user'),
+                   AutocompleteFilter.for_field('recipe'))
+    autocomplete_fields = ('user', 'recipe')
+
+
+class ShoppingListJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created')
+    list_select_related = ('user',)
+    list_filter = ('status',)
+    raw_id_fields = ('user',)
 
 
 admin.site.register(TagRecipe, TagRecipeAdmin)
@@ -69,3 +118,4 @@ admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag, TagAdmin)
+admin.site.register(ShoppingListJob, ShoppingListJobAdmin)
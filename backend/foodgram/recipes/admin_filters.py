@@ -0,0 +1,52 @@
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    template = 'admin/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        field = model._meta.get_field(self.field_name)
+        self.title = field.verbose_name
+        self.parameter_name = f'{self.field_name}__{field.target_field.name}'
+        super().__init__(request, params, model, model_admin)
+        widget = AutocompleteSelect(field, model_admin.admin_site)
+        form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=widget,
+            required=False)
+        self.widget_id = f'id_{self.parameter_name}'
+        self.rendered_widget = form_field.widget.render(
+            self.parameter_name, self.value(), attrs={'id': self.widget_id})
+
+    @classmethod
+    def for_field(cls, field_name):
+        return type(
+            f'{field_name.title()}AutocompleteFilter', (cls,),
+            {'field_name': field_name})
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class AutocompleteFilterMixin:
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if (isinstance(list_filter, type)
+                    and issubclass(list_filter, AutocompleteFilter)):
+                field = self.model._meta.get_field(list_filter.field_name)
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
@@ -0,0 +1,108 @@
+from django.shortcuts import get_object_or_404
+from django_filters.utils import translate_validation
+from foodgram.asynchronous import (
+    json_response, paginate, paginated_response, read_only_view, run_in_thread,
+)
+from foodgram.gateway_cache import add_keys, get_key
+from foodgram.serialization import compile_serializer
+from rest_framework import filters
+
+from . import ranking
+from .filters import RecipeFilter
+from .models import Ingredient, Recipe, Tag
+from .serializers import (
+    IngredientSerializer, RecipeReadSerializer, TagSerializer,
+)
+from .views import (
+    IngredientViewSet, RecipeViewSet, TagViewSet, add_recipe_keys,
+)
+from users.pagination import KeysetPagination
+from users.subscriptions import load_subscriptions
+
+
+def get_recipes(request):
+    return Recipe.objects.for_fields(
+        RecipeReadSerializer.get_requested_fields(request.query_params),
+        request.user)
+
+
+def filter_recipes(request):
+    filterset = RecipeFilter(
+        request.query_params,
+        queryset=get_recipes(request),
+        request=request)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+def serialize_recipes(request, recipes, many=False):
+    fields = RecipeReadSerializer.get_requested_fields(request.query_params)
+    if 'author' in fields:
+        load_subscriptions(
+            request, {recipe.author_id for recipe in (
+                recipes if many else (recipes,))})
+    return compile_serializer(RecipeReadSerializer(
+        recipes, many=many,
+        context={'request': request, 'fields': fields})).data
+
+
+@read_only_view(RecipeViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def recipe_list(request):
+    queryset = await run_in_thread(filter_recipes, request)
+    field = ranking.get_ranking(request.query_params)
+    if field is None:
+        pagination, recipes = await paginate(
+            request, queryset, view=RecipeViewSet)
+    else:
+        pagination = KeysetPagination(field)
+        recipes = await run_in_thread(
+            pagination.paginate_queryset, queryset, request)
+    add_recipe_keys(request, recipes)
+    data = await run_in_thread(serialize_recipes, request, recipes, True)
+    return paginated_response(pagination, data)
+
+
+@read_only_view(RecipeViewSet.as_view(
+    {'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'}))
+async def recipe_detail(request, pk):
+    recipe = await run_in_thread(
+        lambda: get_object_or_404(get_recipes(request), pk=pk))
+    add_recipe_keys(request, (recipe,), many=False)
+    data = await run_in_thread(serialize_recipes, request, recipe)
+    return json_response(data)
+
+
+@read_only_view(TagViewSet.as_view({'get': 'list'}))
+async def tag_list(request):
+    add_keys(request, get_key(Tag))
+    tags = await run_in_thread(lambda: compile_serializer(
+        TagSerializer(Tag.objects.all(), many=True), rows=True).data)
+    return json_response(tags)
+
+
+@read_only_view(TagViewSet.as_view({'get': 'retrieve'}))
+async def tag_detail(request, pk):
+    add_keys(request, get_key(Tag))
+    tag = await run_in_thread(get_object_or_404, Tag, pk=pk)
+    return json_response(compile_serializer(TagSerializer(tag)).data)
+
+
+@read_only_view(IngredientViewSet.as_view({'get': 'list'}))
+async def ingredient_list(request):
+    add_keys(request, get_key(Ingredient))
+    ingredients = await run_in_thread(lambda: compile_serializer(
+        IngredientSerializer(
+            filters.SearchFilter().filter_queryset(
+                request, Ingredient.objects.all(), IngredientViewSet),
+            many=True),
+        rows=True).data)
+    return json_response(ingredients)
+
+
+@read_only_view(IngredientViewSet.as_view({'get': 'retrieve'}))
+async def ingredient_detail(request, pk):
+    add_keys(request, get_key(Ingredient))
+    ingredient = await run_in_thread(get_object_or_404, Ingredient, pk=pk)
+    return json_response(
+        compile_serializer(IngredientSerializer(ingredient)).data)
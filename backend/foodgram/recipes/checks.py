@@ -0,0 +1,13 @@
+from django.core.checks import Error, register
+from django.core.exceptions import ImproperlyConfigured
+
+from . import throttling
+
+
+@register()
+def check_throttle_backend(app_configs, **kwargs):
+    try:
+        throttling.get_backend()
+    except ImproperlyConfigured as error:
+        return [Error(str(error), id='recipes.E001')]
+    return []
@@ -0,0 +1,52 @@
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from foodgram.deletion import bulk_delete
+
+from .models import Recipe, RecipeChange
+from .signals import mark_stale, purge_recipes
+from users.authentication import token_cache
+from users.pagination import invalidate_cached_counts
+
+User = get_user_model()
+
+
+def is_soft(soft):
+    return settings.DELETION['SOFT'] if soft is None else soft
+
+
+def delete_recipes(queryset, soft=None):
+    if not is_soft(soft):
+        return bulk_delete(queryset, settings.DELETION['BATCH_SIZE'])
+    ids = list(queryset.values_list('id', flat=True))
+    count = queryset.update(deleted=timezone.now())
+    mark_stale(*ids)
+    purge_recipes(*ids, listing=True)
+    RecipeChange.log(Recipe, ids, deleted=True)
+    invalidate_cached_counts(Recipe)
+    return count, {Recipe._meta.label: count}
+
+
+def delete_users(queryset, soft=None):
+    if not is_soft(soft):
+        return bulk_delete(queryset, settings.DELETION['BATCH_SIZE'])
+    _, deleted = delete_recipes(
+        Recipe.objects.filter(author__in=queryset), soft=True)
+    ids = list(queryset.values_list('id', flat=True))
+    count = queryset.filter(deleted__isnull=True).update(
+        is_active=False, deleted=timezone.now())
+    token_cache.delete_user(*ids)
+    invalidate_cached_counts(User)
+    deleted[User._meta.label] = count
+    return sum(deleted.values()), deleted
+
+
+def purge(batch_size=None):
+    batch_size = batch_size or settings.DELETION['BATCH_SIZE']
+    deleted = Counter()
+    for queryset in (Recipe._base_manager.filter(deleted__isnull=False),
+                     User.objects.filter(deleted__isnull=False)):
+        deleted.update(bulk_delete(queryset, batch_size)[1])
+    return deleted
@@ -1,3 +1,4 @@
+from django.db.models import Count, F
 from django_filters.rest_framework import FilterSet, filters
 
 from .models import Recipe, Tag
@@ -8,16 +9,51 @@ class RecipeFilter(FilterSet):
         field_name='tags__slug',
         to_field_name='slug',
         queryset=Tag.objects.all(),
+        method='filter_tags',
     )
+    tags_match = filters.ChoiceFilter(
+        method='filter_tags_match',
+        choices=(
+            ('any', 'Любой из тэгов'),
+            ('all', 'Все тэги'),
+        ))
 
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    calories = filters.RangeFilter()
+    price = filters.RangeFilter()
+    ordering = filters.ChoiceFilter(
+        method='filter_ordering',
+        choices=(
+            ('calories', 'Калорийность'),
+            ('-calories', 'Калорийность по убыванию'),
+            ('price', 'Стоимость'),
+            ('-price', 'Стоимость по убыванию'),
+            ('popular', 'Популярные'),
+            ('trending', 'В тренде'),
+        ))
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author',)
 
+    def filter_tags(self, queryset, name, tags):
+        if not tags:
+            return queryset
+        match_all = self.form.cleaned_data.get('tags_match') == 'all'
+        if all(tag.bit is not None for tag in tags):
+            return queryset.with_tags(tags, match_all)
+        queryset = queryset.filter(tags__in=tags)
+        if not match_all:
+            return queryset.distinct()
+        return queryset.alias(
+            matched_tags=Count('tags', distinct=True)
+        ).filter(matched_tags=len(tags))
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
+
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
@@ -29,3 +65,11 @@ class RecipeFilter(FilterSet):
         if value and not user.is_anonymous:
             return queryset.filter(shopping_cart__user=user)
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        field = value.lstrip('-')
+        if field not in ('calories', 'price'):
+            return queryset
+        if value.startswith('-'):
+            return queryset.order_by(F(field).desc(nulls_last=True), '-id')
+        return queryset.order_by(F(field).asc(nulls_last=True), 'id')
@@ -0,0 +1,128 @@
+import logging
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import lru_cache, partial
+
+import django
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import media
+from .models import ShoppingListJob
+from .shopping_list import get_digest, get_snapshot, render_to_storage
+
+logger = logging.getLogger(__name__)
+
+ENQUEUE_ATTEMPTS = 3
+
+
+class BaseBackend:
+
+    def __init__(self, workers=None):
+        self.workers = workers
+
+    def submit(self, job_id, snapshot, name):
+        raise NotImplementedError
+
+    def complete(self, job_id, name):
+        updated = ShoppingListJob.objects.filter(
+            id=job_id, status=ShoppingListJob.PENDING
+        ).update(status=ShoppingListJob.DONE, file=name)
+        if not updated:
+            media.delete_on_commit([name])
+
+    def fail(self, job_id):
+        logger.exception('Не удалось сформировать список покупок %s', job_id)
+        ShoppingListJob.objects.filter(id=job_id).update(
+            status=ShoppingListJob.FAILED)
+
+
+class LocalBackend(BaseBackend):
+
+    def submit(self, job_id, snapshot, name):
+        try:
+            name = render_to_storage(snapshot, name)
+        except Exception:
+            self.fail(job_id)
+        else:
+            self.complete(job_id, name)
+
+
+class ProcessPoolBackend(BaseBackend):
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup)
+
+    def submit(self, job_id, snapshot, name):
+        future = self.executor.submit(render_to_storage, snapshot, name)
+        future.add_done_callback(partial(self.on_done, job_id))
+
+    def on_done(self, job_id, future):
+        try:
+            name = future.result()
+        except Exception:
+            self.fail(job_id)
+        else:
+            self.complete(job_id, name)
+        finally:
+            close_old_connections()
+
+
+def is_enabled():
+    return bool(settings.SHOPPING_LIST_JOBS['BACKEND'])
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    options = settings.SHOPPING_LIST_JOBS
+    return import_string(options['BACKEND'])(workers=options['WORKERS'])
+
+
+def expire(jobs):
+    options = settings.SHOPPING_LIST_JOBS
+    now = timezone.now()
+    jobs.filter(
+        status=ShoppingListJob.PENDING,
+        created__lt=now - timedelta(seconds=options['TIMEOUT'])
+    ).update(status=ShoppingListJob.FAILED)
+    expired = jobs.filter(
+        status=ShoppingListJob.DONE,
+        created__lt=now - timedelta(seconds=options['TTL']))
+    with transaction.atomic():
+        names = list(expired.select_for_update().values_list(
+            'file', flat=True))
+        if names:
+            expired.update(status=ShoppingListJob.EXPIRED, file='')
+            media.delete_on_commit(names)
+
+
+def enqueue(user):
+    snapshot = get_snapshot(user)
+    digest = get_digest(snapshot)
+    jobs = ShoppingListJob.objects.filter(user=user, digest=digest)
+    expire(jobs)
+    active = jobs.filter(status__in=ShoppingListJob.ACTIVE_STATUSES)
+    for attempt in range(ENQUEUE_ATTEMPTS):
+        job = active.first()
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                job = ShoppingListJob.objects.create(user=user, digest=digest)
+        except IntegrityError:
+            if attempt == ENQUEUE_ATTEMPTS - 1:
+                raise
+            continue
+        get_backend().submit(
+            job.id, snapshot, f'shopping_lists/{digest}.pdf')
+        job.refresh_from_db()
+        return job
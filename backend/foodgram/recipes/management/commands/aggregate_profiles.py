@@ -0,0 +1,69 @@
+import os
+import re
+
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from foodgram.profiling import STACKS_SUFFIX, load, write_stacks
+
+
+def get_file_name(view):
+    return re.sub(r'[^\w.-]', '_', view) + STACKS_SUFFIX
+
+
+class Command(BaseCommand):
+    help = ('Объединяет сохраненные профили запросов по эндпоинтам и '
+            'показывает самые затратные функции.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.PROFILING['PATH'])
+        parser.add_argument(
+            '--output',
+            help='Каталог для объединенных стеков по эндпоинтам.')
+        parser.add_argument('--view', help='Только профили этого эндпоинта.')
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['path']):
+            raise CommandError(f'Каталог {options["path"]} не найден.')
+        endpoints = defaultdict(lambda: {
+            'count': 0, 'duration': 0, 'queries': 0, 'stacks': Counter()})
+        for meta, stacks in load(options['path']):
+            view = meta['view'] or 'unknown'
+            if options['view'] and view != options['view']:
+                continue
+            endpoint = endpoints[view]
+            endpoint['count'] += 1
+            endpoint['duration'] += meta['duration']
+            endpoint['queries'] += meta['queries']
+            endpoint['stacks'].update(stacks)
+        if not endpoints:
+            raise CommandError('Профили не найдены.')
+        if options['output']:
+            os.makedirs(options['output'], exist_ok=True)
+        for view, endpoint in sorted(
+                endpoints.items(), key=lambda item: -item[1]['duration']):
+            self.write_endpoint(view, endpoint, options['limit'])
+            if options['output']:
+                self.save(view, endpoint['stacks'], options['output'])
+
+    def write_endpoint(self, view, endpoint, limit):
+        count = endpoint['count']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{view}: профилей {count}, '
+            f'среднее время {endpoint["duration"] / count:.1f} мс, '
+            f'запросов к БД {endpoint["queries"] / count:.1f}'))
+        own = Counter()
+        for stack, weight in endpoint['stacks'].items():
+            own[stack.rpartition(';')[2]] += weight
+        total = sum(own.values()) or 1
+        for frame, weight in own.most_common(limit):
+            self.stdout.write(
+                f'{weight / total:>7.1%} {weight / 1000 / count:>9.1f} мс  '
+                f'{frame}')
+
+    def save(self, view, stacks, output):
+        path = os.path.join(output, get_file_name(view))
+        write_stacks(path, stacks)
+        self.stdout.write(f'Стеки сохранены в {path}')
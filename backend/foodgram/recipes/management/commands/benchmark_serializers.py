@@ -0,0 +1,66 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from foodgram.renderers import FastJSONRenderer
+from foodgram.serialization import compile_serializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from recipes.models import Recipe
+from recipes.serializers import RecipeReadSerializer
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func()
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость DRF и скомпилированных сериализаторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        recipes = list(Recipe.objects.for_fields(
+            RecipeReadSerializer.Meta.fields))
+        if not recipes:
+            raise CommandError('Нет рецептов для замера.')
+        recipes = (recipes * (count // len(recipes) + 1))[:count]
+        request = Request(RequestFactory().get('/api/recipes/'))
+        context = {'request': request}
+
+        def drf():
+            with override_settings(COMPILED_SERIALIZERS=False):
+                data = RecipeReadSerializer(
+                    recipes, many=True, context=context).data
+                return JSONRenderer().render(data)
+
+        def compiled():
+            with override_settings(COMPILED_SERIALIZERS=True):
+                data = compile_serializer(RecipeReadSerializer(
+                    recipes, many=True, context=context)).data
+                return FastJSONRenderer().render(data)
+
+        drf_time, drf_output = measure(drf, options['repeat'])
+        compiled_time, compiled_output = measure(
+            compiled, options['repeat'])
+        if drf_output != compiled_output:
+            raise CommandError('Ответы сериализаторов различаются.')
+        scale = 1000 / count * 1000
+        self.stdout.write(
+            f'DRF: {drf_time * scale:.1f} мс на 1000 рецептов')
+        self.stdout.write(
+            f'Скомпилированный: {compiled_time * scale:.1f} мс '
+            f'на 1000 рецептов')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {drf_time / compiled_time:.1f}x'))
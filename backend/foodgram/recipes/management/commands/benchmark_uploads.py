@@ -0,0 +1,94 @@
+import base64
+import json
+import os
+import tracemalloc
+
+from io import BytesIO
+from tempfile import TemporaryDirectory
+
+from django.core.management import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from recipes.models import Ingredient, Tag
+from recipes.query_plans import seed, test_database
+from recipes.views import RecipeViewSet
+
+MB = 1024 * 1024
+
+
+def make_image(size):
+    from PIL import Image
+
+    side = int((size / 3) ** 0.5)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = BytesIO()
+    image.save(buffer, 'PNG', compress_level=0)
+    return buffer.getvalue()
+
+
+def measure(view, request):
+    tracemalloc.start()
+    try:
+        response = view(request)
+        response.render()
+        return tracemalloc.get_traced_memory()[1], response
+    finally:
+        tracemalloc.stop()
+        request.close()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пиковую память при загрузке изображения рецепта '
+            'в base64 и в multipart.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=float, default=10,
+            help='Размер изображения в мегабайтах.')
+
+    def handle(self, *args, **options):
+        with test_database(), TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            self.run_benchmark(
+                seed(10), make_image(int(options['size'] * MB)))
+
+    def run_benchmark(self, context, image):
+        factory = RequestFactory()
+        auth = {'HTTP_AUTHORIZATION': f'Token {context["token"]}'}
+        payload = {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': pk, 'amount': 10}
+                for pk in Ingredient.objects.values_list('id', flat=True)[:3]],
+        }
+        image_file = BytesIO(image)
+        image_file.name = 'image.png'
+        requests = {
+            'base64': factory.post(
+                '/api/recipes/',
+                json.dumps({
+                    **payload,
+                    'image': 'data:image/png;base64,'
+                             + base64.b64encode(image).decode()}),
+                content_type='application/json', **auth),
+            'multipart': factory.post(
+                '/api/recipes/',
+                {'data': json.dumps(payload), 'image': image_file}, **auth),
+        }
+        view = RecipeViewSet.as_view({'post': 'create'})
+        self.stdout.write(f'Изображение: {len(image) / MB:.1f} МБ')
+        peaks = {}
+        for name, request in requests.items():
+            size = int(request.META['CONTENT_LENGTH'])
+            peaks[name], response = measure(view, request)
+            if response.status_code != 201:
+                raise CommandError(
+                    f'{name}: код ответа {response.status_code}')
+            self.stdout.write(
+                f'{name}: тело запроса {size / MB:.1f} МБ, '
+                f'пик памяти {peaks[name] / MB:.1f} МБ')
+        self.stdout.write(self.style.SUCCESS(
+            f'Экономия памяти: {peaks["base64"] / peaks["multipart"]:.1f}x'))
@@ -0,0 +1,183 @@
+import os
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import TemporaryDirectory
+from threading import Thread
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.test import Client, override_settings
+from foodgram import gateway_cache
+from foodgram.gateway_cache import KEY_HEADER, NginxPurgeClient, get_key
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.query_plans import seed, test_database
+
+User = get_user_model()
+
+
+class PurgeHandler(BaseHTTPRequestHandler):
+
+    def do_PURGE(self):
+        self.server.purged.update(self.headers.get(KEY_HEADER, '').split())
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PurgeHandler)
+    server.purged = set()
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get_keys(response):
+    return set(response.get(KEY_HEADER, '').split())
+
+
+class Command(BaseCommand):
+    help = ('Проверяет суррогатные ключи ответов и сброс кэша шлюза '
+            'через локальную заглушку.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=30)
+
+    def handle(self, *args, **options):
+        server = start_stub()
+        gateway = {
+            **settings.GATEWAY_CACHE,
+            'PURGE_CLIENT': 'foodgram.gateway_cache.HTTPPurgeClient',
+            'PURGE_URL': f'http://127.0.0.1:{server.server_port}/',
+        }
+        gateway_cache.get_purge_client.cache_clear()
+        try:
+            with test_database():
+                context = seed(options['scale'])
+                with override_settings(GATEWAY_CACHE=gateway):
+                    failed = self.run_checks(server, context)
+                gateway_cache.get_purge_client.cache_clear()
+                failed += self.run_index_checks()
+        finally:
+            gateway_cache.get_purge_client.cache_clear()
+            server.shutdown()
+        if failed:
+            raise CommandError(f'Проверок не пройдено: {failed}')
+        self.stdout.write(self.style.SUCCESS('Кэш шлюза работает'))
+
+    def check_keys(self, name, expected, actual):
+        missing = expected - actual
+        if missing:
+            self.stdout.write(self.style.ERROR(
+                f'{name}: нет ключей {", ".join(sorted(missing))}'))
+        else:
+            self.stdout.write(f'{name}: OK')
+        return bool(missing)
+
+    def check_purge(self, server, name, expected, action):
+        server.purged.clear()
+        action()
+        return self.check_keys(name, expected, server.purged)
+
+    def run_checks(self, server, context):
+        client = Client()
+        auth = {'HTTP_AUTHORIZATION': f'Token {context["token"]}'}
+        user = User.objects.get(auth_token__key=context['token'])
+        own = Recipe.objects.filter(author=user).first()
+        other = Recipe.objects.exclude(author=user).first()
+        failed = 0
+
+        response = client.get('/api/recipes/')
+        expected = {get_key(Recipe), get_key(Tag), get_key(Ingredient)}
+        for recipe in response.json()['results']:
+            expected.add(get_key(Recipe, recipe['id']))
+            expected.add(get_key(User, recipe['author']['id']))
+        failed += self.check_keys(
+            'Лента рецептов', expected, get_keys(response))
+        response = client.get(f'/api/recipes/{other.id}/')
+        failed += self.check_keys('Рецепт', {
+            get_key(Recipe, other.id), get_key(User, other.author_id),
+        }, get_keys(response))
+        if get_key(Recipe) in get_keys(response):
+            self.stdout.write(self.style.ERROR(
+                'Рецепт: лишний ключ ленты'))
+            failed += 1
+        for url, model in (('/api/tags/', Tag),
+                           ('/api/ingredients/?name=соль', Ingredient)):
+            failed += self.check_keys(
+                url, {get_key(model)}, get_keys(client.get(url)))
+        if get_keys(client.get('/api/recipes/', **auth)):
+            self.stdout.write(self.style.ERROR(
+                'Ключи в ответе авторизованному пользователю'))
+            failed += 1
+
+        failed += self.check_purge(
+            server, 'Изменение рецепта', {get_key(Recipe, own.id)},
+            lambda: client.patch(
+                f'/api/recipes/{own.id}/', {'name': 'Новое название'},
+                content_type='application/json', **auth))
+        failed += self.check_purge(
+            server, 'Удаление рецепта',
+            {get_key(Recipe), get_key(Recipe, own.id)},
+            lambda: client.delete(f'/api/recipes/{own.id}/', **auth))
+        failed += self.check_purge(
+            server, 'Новый рецепт', {get_key(Recipe)},
+            lambda: Recipe.objects.create(
+                name='Новый', image=other.image, author=user, text='Текст',
+                cooking_time=1))
+        failed += self.check_purge(
+            server, 'Изменение тэга', {get_key(Tag)},
+            lambda: Tag.objects.first().save())
+        failed += self.check_purge(
+            server, 'Изменение ингредиента', {get_key(Ingredient)},
+            lambda: Ingredient.objects.first().save())
+        author = other.author
+        author.first_name = 'Другое'
+        failed += self.check_purge(
+            server, 'Изменение автора', {get_key(User, author.id)},
+            author.save)
+        return failed
+
+    def cache_response(self, client, cache_path, url):
+        cache_key = f'httptestserver{url}'
+        response = client.get(url, HTTP_X_CACHE_KEY=cache_key)
+        path = os.path.join(
+            cache_path, NginxPurgeClient.get_file_name(cache_key))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(
+                f'KEY: {cache_key}\r\n{KEY_HEADER}: '
+                f'{response[KEY_HEADER]}\r\n\r\n'.encode())
+        return path
+
+    def run_index_checks(self):
+        client = Client()
+        recipe = Recipe.objects.first()
+        with TemporaryDirectory() as cache_path, \
+                TemporaryDirectory() as index_path, \
+                override_settings(GATEWAY_CACHE={
+                    **settings.GATEWAY_CACHE,
+                    'PURGE_CLIENT': 'foodgram.gateway_cache.NginxPurgeClient',
+                    'CACHE_PATH': cache_path,
+                    'INDEX_PATH': index_path,
+                }):
+            detail = self.cache_response(
+                client, cache_path, f'/api/recipes/{recipe.id}/')
+            tags = self.cache_response(client, cache_path, '/api/tags/')
+            recipe.save()
+            gateway_cache.get_purge_client.cache_clear()
+            failed = 0
+            if os.path.exists(detail):
+                self.stdout.write(self.style.ERROR(
+                    'Индекс nginx: файл рецепта не удален'))
+                failed += 1
+            if not os.path.exists(tags):
+                self.stdout.write(self.style.ERROR(
+                    'Индекс nginx: удален лишний файл'))
+                failed += 1
+            if not failed:
+                self.stdout.write('Индекс nginx: OK')
+            return failed
@@ -0,0 +1,52 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from recipes import query_plans
+
+
+class Command(BaseCommand):
+    help = ('Проверяет SQL и планы запросов горячих эндпоинтов '
+            'на тестовой базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Записать текущие результаты как эталон.')
+        parser.add_argument('--scale', type=int, default=1000)
+        parser.add_argument('--baseline', default=query_plans.BASELINE_PATH)
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        baseline = query_plans.load_baseline(options['baseline'])
+        if not options['update'] and vendor not in baseline:
+            raise CommandError(
+                f'Нет эталона для {vendor}, запустите с --update.')
+        with query_plans.test_database():
+            context = query_plans.seed(options['scale'])
+            results = query_plans.run(context)
+        if options['update']:
+            baseline[vendor] = results
+            query_plans.save_baseline(baseline, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Эталон для {vendor} обновлен: {len(results)} сценариев'))
+            return
+        failed = 0
+        indexes = {
+            name: indexes for name, *_, indexes in query_plans.SCENARIOS}
+        for name, result in results.items():
+            expected = baseline[vendor].get(name)
+            if expected is None:
+                self.stdout.write(self.style.WARNING(f'{name}: нет эталона'))
+                continue
+            problems = query_plans.compare(
+                expected, result, indexes[name])
+            if not problems:
+                self.stdout.write(f'{name}: OK ({result["queries"]})')
+                continue
+            failed += 1
+            self.stdout.write(self.style.ERROR(f'{name}:'))
+            for problem in problems:
+                self.stdout.write(f'  {problem}')
+        if failed:
+            raise CommandError(f'Регрессий в запросах: {failed}')
+        self.stdout.write(self.style.SUCCESS('Планы запросов не изменились'))
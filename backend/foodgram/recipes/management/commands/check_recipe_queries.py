@@ -0,0 +1,87 @@
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.query_plans import seed, test_database
+
+User = get_user_model()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+BUDGETS = {
+    'Создание рецепта': 10,
+    'Создание рецепта с 8 тэгами и 20 ингредиентами': 10,
+    'Изменение рецепта': 36,
+    'Изменение названия': 7,
+}
+
+
+def get_payload(tags, ingredients):
+    return {
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10}
+            for ingredient in ingredients],
+        'name': 'Рецепт',
+        'image': IMAGE,
+        'text': 'Описание',
+        'cooking_time': 10,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Проверяет число запросов к БД при создании и изменении '
+            'рецепта.')
+
+    def handle(self, *args, **options):
+        with test_database(), TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            failed = self.run_checks(seed(30))
+        if failed:
+            raise CommandError(f'Превышен бюджет запросов: {failed}')
+        self.stdout.write(self.style.SUCCESS('Бюджет запросов соблюден'))
+
+    def request(self, name, method, url, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(
+                url, data, content_type='application/json', **self.auth)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{name}: ответ {response.status_code} {response.content}')
+        budget = BUDGETS[name]
+        if len(queries) <= budget:
+            self.stdout.write(f'{name}: {len(queries)} из {budget}')
+            return False
+        self.stdout.write(self.style.ERROR(
+            f'{name}: {len(queries)} запросов, бюджет {budget}'))
+        for query in queries.captured_queries:
+            self.stdout.write(f'    {query["sql"]}')
+        return True
+
+    def run_checks(self, context):
+        self.client = Client()
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {context["token"]}'}
+        user = User.objects.get(auth_token__key=context['token'])
+        own = Recipe.objects.filter(author=user).first()
+        tags = list(Tag.objects.order_by('id'))
+        ingredients = list(Ingredient.objects.order_by('id')[:20])
+        failed = 0
+        failed += self.request(
+            'Создание рецепта', 'post', '/api/recipes/',
+            get_payload(tags[:2], ingredients[:6]))
+        failed += self.request(
+            'Создание рецепта с 8 тэгами и 20 ингредиентами', 'post',
+            '/api/recipes/', get_payload(tags, ingredients))
+        failed += self.request(
+            'Изменение рецепта', 'patch', f'/api/recipes/{own.id}/',
+            get_payload(tags[2:4], ingredients[6:12]))
+        failed += self.request(
+            'Изменение названия', 'patch', f'/api/recipes/{own.id}/',
+            {'name': 'Новое название'})
+        return failed
@@ -0,0 +1,51 @@
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+
+from recipes import jobs, media
+from recipes.models import ShoppingListJob
+
+
+def format_size(size):
+    for unit in ('Б', 'КБ', 'МБ'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} ГБ'
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы медиа, на которые не ссылается ни одна запись.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, ничего не удаляя.')
+        parser.add_argument(
+            '--grace-hours', type=float,
+            help='Не трогать файлы моложе указанного числа часов.')
+        parser.add_argument(
+            '--quarantine',
+            help='Переносить файлы в этот каталог вместо удаления.')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        grace_period = options['grace_hours']
+        if grace_period is not None:
+            grace_period *= 60 * 60
+        if not options['dry_run']:
+            jobs.expire(ShoppingListJob.objects.all())
+        count = total = 0
+        for name, size in media.find_orphans(
+                grace_period, options['batch_size']):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{name} ({format_size(size)})')
+            if not options['dry_run']:
+                if options['quarantine']:
+                    media.quarantine(name, options['quarantine'])
+                else:
+                    default_storage.delete(name)
+            count += 1
+            total += size
+        action = 'Будет освобождено' if options['dry_run'] else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {count}. {action}: {format_size(total)}'))
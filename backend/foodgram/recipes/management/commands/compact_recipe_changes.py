@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+
+from recipes.sync import compact
+
+
+class Command(BaseCommand):
+    help = ('Сжимает журнал изменений рецептов, оставляя последнюю запись '
+            'для каждого рецепта, избранного и списка покупок.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала: {compact()}'))
@@ -1,19 +1,70 @@
+import json
+
 from csv import reader
+from pathlib import Path
 
 from django.core.management import BaseCommand
+from django.db import transaction
+from foodgram import gateway_cache
+
+from recipes.models import Ingredient, Recipe, RecipeChange
+from recipes.signals import purge_recipes
+
 
-from recipes.models import Ingredient
+def read_csv(path):
+    with open(path, 'r', encoding='UTF-8') as ingredients:
+        for row in reader(ingredients):
+            if len(row) == 2:
+                yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+def read_json(path):
+    with open(path, 'r', encoding='UTF-8') as ingredients:
+        yield from json.load(ingredients)
 
 
 class Command(BaseCommand):
 
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='./data/ingredients.csv')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **kwargs):
-        with open(
-                './data/ingredients.csv', 'r',
-                encoding='UTF-8'
-        ) as ingredients:
-            for row in reader(ingredients):
-                if len(row) == 2:
-                    Ingredient.objects.get_or_create(
-                        name=row[0], measurement_unit=row[1],
-                    )
+        path = Path(kwargs['path'])
+        rows = read_json(path) if path.suffix == '.json' else read_csv(path)
+        existing = {
+            (ingredient.name, ingredient.measurement_unit): ingredient
+            for ingredient in Ingredient.objects.all()}
+        created, updated = {}, {}
+        for row in rows:
+            key = (row['name'], row['measurement_unit'])
+            attributes = {
+                field: row[field] for field in Ingredient.ROLLUP_FIELDS
+                if row.get(field) is not None}
+            ingredient = existing.get(key) or created.get(key)
+            if ingredient is None:
+                created[key] = Ingredient(
+                    name=key[0], measurement_unit=key[1], **attributes)
+                continue
+            for field, value in attributes.items():
+                if getattr(ingredient, field) != value:
+                    setattr(ingredient, field, value)
+                    if ingredient.pk is not None:
+                        updated[key] = ingredient
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                created.values(), batch_size=kwargs['batch_size'])
+            Ingredient.objects.bulk_update(
+                updated.values(), Ingredient.ROLLUP_FIELDS,
+                batch_size=kwargs['batch_size'])
+            recipe_ids = list(Recipe.objects.filter(
+                ingredients__in=updated.values()).values_list(
+                    'id', flat=True).distinct())
+            if recipe_ids:
+                Recipe.objects.filter(id__in=recipe_ids).update_rollups()
+                RecipeChange.log(Recipe, recipe_ids)
+            if created or updated:
+                gateway_cache.purge(gateway_cache.get_key(Ingredient))
+                purge_recipes(*recipe_ids)
+        self.stdout.write(
+            f'Добавлено: {len(created)}, обновлено: {len(updated)}')
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+SCRIPT = '''
+import django
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+import_string({wsgi!r})
+get_resolver().url_patterns
+'''
+
+ImportTime = namedtuple('ImportTime', 'module depth own cumulative')
+
+
+def parse(output):
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield ImportTime(
+            name.strip(), depth, int(own) / 1000, int(cumulative) / 1000)
+
+
+def get_project_packages():
+    return {
+        entry.name for entry in os.scandir(settings.BASE_DIR)
+        if entry.is_dir() and os.path.exists(
+            os.path.join(entry.path, '__init__.py'))}
+
+
+class Command(BaseCommand):
+    help = 'Показывает время импорта модулей при старте WSGI-приложения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Показывать сторонние модули, а не только модули проекта.')
+        parser.add_argument(
+            '--max-time', type=float,
+            help='Завершиться с ошибкой, если импорт дольше, мс.')
+        parser.add_argument(
+            '--forbid', nargs='+', default=(),
+            help='Завершиться с ошибкой, если импортирован любой из пакетов.')
+
+    def handle(self, *args, **options):
+        script = SCRIPT.format(wsgi=settings.WSGI_APPLICATION)
+        env = {**os.environ,
+               'DJANGO_SETTINGS_MODULE': os.environ.get(
+                   'DJANGO_SETTINGS_MODULE', 'foodgram.settings')}
+        result = subprocess.run(
+            (sys.executable, '-X', 'importtime', '-c', script),
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(result.stderr)
+        times = list(parse(result.stderr))
+        total = sum(time.cumulative for time in times if time.depth == 0)
+        forbidden = sorted(
+            {time.module.split('.')[0] for time in times}
+            & set(options['forbid']))
+        if not options['all']:
+            packages = get_project_packages()
+            times = [time for time in times
+                     if time.module.split('.')[0] in packages]
+        times.sort(key=lambda time: time.cumulative, reverse=True)
+        self.stdout.write(f'{"Модуль":<50} {"Свое, мс":>10} {"Всего, мс":>10}')
+        for time in times[:options['limit']]:
+            self.stdout.write(
+                f'{time.module:<50} {time.own:>10.1f} '
+                f'{time.cumulative:>10.1f}')
+        self.stdout.write(f'Общее время импорта: {total:.1f} мс')
+        if forbidden:
+            raise CommandError(
+                f'При старте импортированы пакеты: {", ".join(forbidden)}.')
+        if options['max_time'] is not None and total > options['max_time']:
+            raise CommandError(
+                f'Импорт занял {total:.1f} мс, '
+                f'допустимо {options["max_time"]:.1f} мс.')
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from recipes.deletion import purge
+
+
+class Command(BaseCommand):
+    help = 'Удаляет помеченные на удаление рецепты и пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        deleted = purge(batch_size=options['batch_size'])
+        for label, count in sorted(deleted.items()):
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {sum(deleted.values())}'))
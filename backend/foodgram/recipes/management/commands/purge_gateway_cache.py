@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from foodgram.gateway_cache import NginxPurgeClient, get_purge_client
+
+
+class Command(BaseCommand):
+    help = ('Сбрасывает ответы кэша шлюза по суррогатным ключам. С --scan '
+            'обходит весь каталог кэша nginx без индекса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('keys', nargs='+')
+        parser.add_argument('--scan', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['scan']:
+            removed = NginxPurgeClient(settings.GATEWAY_CACHE).scan(
+                options['keys'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено файлов кэша: {removed}'))
+            return
+        client = get_purge_client()
+        if client is None:
+            raise CommandError('GATEWAY_CACHE_PURGE_CLIENT не задан.')
+        client.purge(options['keys'])
+        self.stdout.write(self.style.SUCCESS('Ключи сброшены'))
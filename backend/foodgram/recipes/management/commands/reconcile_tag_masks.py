@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import Recipe, Tag, get_tags_mask
+
+
+class Command(BaseCommand):
+    help = 'Назначает тэгам биты и исправляет маски тэгов у рецептов.'
+
+    def handle(self, *args, **options):
+        assigned = 0
+        with transaction.atomic():
+            for tag in Tag.objects.filter(bit__isnull=True).order_by('id'):
+                bit = Tag.get_free_bit()
+                if bit is None:
+                    break
+                Tag.objects.filter(pk=tag.pk).update(bit=bit)
+                assigned += 1
+            fixed = Recipe.objects.alias(expected=get_tags_mask()).exclude(
+                tags_mask=F('expected')).update_tags_mask()
+        missing = Tag.objects.filter(bit__isnull=True).count()
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'Тэгов без бита: {missing}, фильтр по ним работает '
+                f'через JOIN'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Назначено битов: {assigned}. Исправлено масок: {fixed}'))
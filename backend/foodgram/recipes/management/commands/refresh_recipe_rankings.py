@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from recipes import ranking
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинги популярности рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = ranking.refresh(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {count}'))
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from recipes import similarity
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие рецепты.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все рецепты, а не только измененные.')
+
+    def handle(self, *args, **options):
+        count = similarity.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {count}'))
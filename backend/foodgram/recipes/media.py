@@ -0,0 +1,96 @@
+import os
+import shutil
+import time
+
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import Recipe, ShoppingListJob
+
+FILE_FIELDS = (
+    (Recipe, 'image'),
+    (ShoppingListJob, 'file'),
+)
+
+
+def is_enabled():
+    return settings.MEDIA_CLEANUP['ON_WRITE']
+
+
+def get_file_fields(model):
+    return [name for field_model, name in FILE_FIELDS
+            if issubclass(model, field_model)]
+
+
+def get_directories():
+    return sorted({
+        model._meta.get_field(name).upload_to for model, name in FILE_FIELDS})
+
+
+def iter_files(directory, storage=default_storage):
+    root = storage.path('')
+    stack = [storage.path(directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    name = os.path.relpath(entry.path, root)
+                    yield (name.replace(os.sep, '/'),
+                           stat.st_size, stat.st_mtime)
+
+
+def get_referenced(names):
+    referenced = set()
+    for model, name in FILE_FIELDS:
+        referenced.update(model._base_manager.filter(
+            **{f'{name}__in': names}).values_list(name, flat=True))
+    return referenced
+
+
+def find_orphans(grace_period=None, batch_size=None, storage=default_storage):
+    options = settings.MEDIA_CLEANUP
+    if grace_period is None:
+        grace_period = options['GRACE_PERIOD']
+    batch_size = batch_size or options['BATCH_SIZE']
+    cutoff = time.time() - grace_period
+    for directory in get_directories():
+        files = iter_files(directory, storage)
+        while True:
+            chunk = list(islice(files, batch_size))
+            if not chunk:
+                break
+            batch = [(name, size) for name, size, modified in chunk
+                     if modified < cutoff]
+            referenced = get_referenced([name for name, _ in batch])
+            for name, size in batch:
+                if name not in referenced:
+                    yield name, size
+
+
+def quarantine(name, directory, storage=default_storage):
+    target = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(storage.path(name), target)
+
+
+def delete_unreferenced(names, storage=default_storage):
+    names = set(names) - get_referenced(names)
+    for name in names:
+        storage.delete(name)
+    return names
+
+
+def delete_on_commit(names):
+    names = [name for name in names if name]
+    if is_enabled() and names:
+        transaction.on_commit(lambda: delete_unreferenced(names))
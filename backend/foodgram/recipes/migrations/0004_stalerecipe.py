@@ -0,0 +1,26 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_unique_favorite_shopping_cart'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(unique=True, verbose_name='ID рецепта')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Рецепт для пересчета похожих',
+                'verbose_name_plural': 'Рецепты для пересчета похожих',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='calories',
+            field=models.FloatField(blank=True, null=True, verbose_name='Калории на единицу'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='carbohydrates',
+            field=models.FloatField(blank=True, null=True, verbose_name='Углеводы на единицу'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='fats',
+            field=models.FloatField(blank=True, null=True, verbose_name='Жиры на единицу'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='price',
+            field=models.FloatField(blank=True, null=True, verbose_name='Примерная цена за единицу'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='proteins',
+            field=models.FloatField(blank=True, null=True, verbose_name='Белки на единицу'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='calories',
+            field=models.FloatField(db_index=True, editable=False, null=True, verbose_name='Калории'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='carbohydrates',
+            field=models.FloatField(editable=False, null=True, verbose_name='Углеводы'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='fats',
+            field=models.FloatField(editable=False, null=True, verbose_name='Жиры'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='price',
+            field=models.FloatField(db_index=True, editable=False, null=True, verbose_name='Примерная стоимость'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='proteins',
+            field=models.FloatField(editable=False, null=True, verbose_name='Белки'),
+        ),
+    ]
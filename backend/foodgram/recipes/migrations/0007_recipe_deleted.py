@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_nutrition_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='deleted',
+            field=models.DateTimeField(db_index=True, editable=False, null=True, verbose_name='Дата удаления'),
+        ),
+    ]
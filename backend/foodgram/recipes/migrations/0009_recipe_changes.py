@@ -0,0 +1,40 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_tag_masks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('shoppingcart', 'Список покупок')], max_length=16, verbose_name='Тип')),
+                ('recipe_id', models.BigIntegerField(verbose_name='ID рецепта')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Удаление')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+                ('user', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recipe_changes', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Изменение рецепта',
+                'verbose_name_plural': 'Журнал изменений рецептов',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['kind', 'id'], name='recipes_rec_kind_5359e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['user', 'id'], name='recipes_rec_user_id_c13b32_idx'),
+        ),
+    ]
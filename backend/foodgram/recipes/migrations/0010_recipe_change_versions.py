@@ -0,0 +1,45 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:01
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def publish_changes(apps, schema_editor):
+    RecipeChange = apps.get_model('recipes', 'RecipeChange')
+    RecipeChange.objects.update(version=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_changes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipechange',
+            name='recipes_rec_kind_5359e9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='recipechange',
+            name='recipes_rec_user_id_c13b32_idx',
+        ),
+        migrations.AddField(
+            model_name='recipechange',
+            name='version',
+            field=models.BigIntegerField(null=True, unique=True, verbose_name='Версия'),
+        ),
+        migrations.RunPython(publish_changes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['kind', 'version'], name='recipes_rec_kind_5d9a7c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['user', 'version'], name='recipes_rec_user_id_61843e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(condition=models.Q(('version__isnull', True)), fields=['id'], name='recipe_change_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+
+def expire_duplicates(apps, schema_editor):
+    ShoppingListJob = apps.get_model('recipes', 'ShoppingListJob')
+    seen = set()
+    duplicates = []
+    jobs = ShoppingListJob.objects.filter(
+        status__in=('pending', 'done')).order_by('-created', '-id')
+    for job in jobs.only('id', 'user_id', 'digest').iterator():
+        if (job.user_id, job.digest) in seen:
+            duplicates.append(job.id)
+        seen.add((job.user_id, job.digest))
+    ShoppingListJob.objects.filter(id__in=duplicates).update(status='expired')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_change_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shoppinglistjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('done', 'Готово'), ('failed', 'Ошибка'), ('expired', 'Устарело')], default='pending', max_length=16, verbose_name='Статус'),
+        ),
+        migrations.RunPython(expire_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='shoppinglistjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('pending', 'done'))), fields=('user', 'digest'), name='unique_active_shopping_list_job'),
+        ),
+    ]
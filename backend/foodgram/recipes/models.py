@@ -1,11 +1,15 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models
+from django.db.models.functions import Cast, Coalesce
+from foodgram.deletion import post_bulk_delete
 
 User = get_user_model()
 
 
 class Tag(models.Model):
+    MASK_BITS = 63
+
     name = models.CharField(
         'Название тега', unique=True, max_length=200)
     color = models.CharField(
@@ -13,6 +17,8 @@ class Tag(models.Model):
     slug = models.SlugField(
         'Сокращенное название тэга',
         unique=True, max_length=200)
+    bit = models.PositiveSmallIntegerField(
+        'Бит в маске тэгов', null=True, unique=True, editable=False)
 
     class Meta:
         ordering = ('id',)
@@ -22,12 +28,46 @@ class Tag(models.Model):
     def __str__(self):
         return f'{self.name} - {self.slug}'
 
+    def save(self, *args, **kwargs):
+        assigned = self.bit is None and not self._state.adding
+        if self.bit is None:
+            self.bit = self.get_free_bit()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'bit'}
+        super().save(*args, **kwargs)
+        if assigned and self.bit is not None:
+            Recipe.objects.filter(tags=self).update_tags_mask()
+
+    @classmethod
+    def get_free_bit(cls):
+        used = set(cls.objects.filter(
+            bit__isnull=False).values_list('bit', flat=True))
+        return next(
+            (bit for bit in range(cls.MASK_BITS) if bit not in used), None)
+
+    @staticmethod
+    def get_mask(tags):
+        return sum(
+            1 << bit for bit in {tag.bit for tag in tags} if bit is not None)
+
 
 class Ingredient(models.Model):
+    ROLLUP_FIELDS = ('calories', 'proteins', 'fats', 'carbohydrates', 'price')
+
     name = models.CharField(
         'Название ингрииента', max_length=200)
     measurement_unit = models.CharField(
         'Единица измерения', max_length=200)
+    calories = models.FloatField(
+        'Калории на единицу', null=True, blank=True)
+    proteins = models.FloatField(
+        'Белки на единицу', null=True, blank=True)
+    fats = models.FloatField(
+        'Жиры на единицу', null=True, blank=True)
+    carbohydrates = models.FloatField(
+        'Углеводы на единицу', null=True, blank=True)
+    price = models.FloatField(
+        'Примерная цена за единицу', null=True, blank=True)
 
     class Meta:
         ordering = ('name',)
@@ -38,7 +78,78 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
+def get_tags_mask():
+    return Coalesce(models.Subquery(
+        TagRecipe.objects.filter(
+            recipe=models.OuterRef('pk'), tag__bit__isnull=False
+        ).values('recipe').annotate(mask=Cast(
+            models.Sum(
+                Cast(models.Value(1), models.BigIntegerField()).bitleftshift(
+                    models.F('tag__bit')),
+                distinct=True),
+            models.BigIntegerField())).values('mask')), 0)
+
+
+class RecipeQuerySet(models.QuerySet):
+    MODEL_FIELDS = ('id', 'name', 'image', 'text', 'cooking_time')
+
+    def for_fields(self, fields, user=None):
+        queryset = self.only(
+            'author', *(field for field in self.MODEL_FIELDS
+                        if field in fields))
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(models.Prefetch(
+                'ingredientrecipe_set',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient')))
+        if user is None or user.is_anonymous:
+            return queryset
+        if 'is_favorited' in fields:
+            queryset = queryset.annotate(is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk'))))
+        if 'is_in_shopping_cart' in fields:
+            queryset = queryset.annotate(is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef('pk'))))
+        return queryset
+
+    def update_rollups(self):
+        return self.update(**{
+            field: models.Subquery(
+                IngredientRecipe.objects.filter(
+                    recipe=models.OuterRef('pk'),
+                    **{f'ingredient__{field}__isnull': False}
+                ).values('recipe').annotate(total=models.Sum(
+                    models.F('amount') * models.F(f'ingredient__{field}'),
+                    output_field=models.FloatField())).values('total'))
+            for field in Ingredient.ROLLUP_FIELDS})
+
+    def with_tags(self, tags, match_all=False):
+        mask = Tag.get_mask(tags)
+        queryset = self.alias(
+            matched_tags=models.F('tags_mask').bitand(mask))
+        if match_all:
+            return queryset.filter(matched_tags=mask)
+        return queryset.filter(matched_tags__gt=0)
+
+    def update_tags_mask(self):
+        return self.update(tags_mask=get_tags_mask())
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted__isnull=True)
+
+
 class Recipe(models.Model):
+    NO_SCORE = -1e9
+
     name = models.CharField(
         'Название рецепта', max_length=200)
     image = models.ImageField(
@@ -65,14 +176,53 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Ингредиенты')
 
+    popular_score = models.FloatField(
+        'Рейтинг популярности', default=NO_SCORE, editable=False)
+    trending_score = models.FloatField(
+        'Рейтинг в тренде', default=NO_SCORE, editable=False)
+    calories = models.FloatField(
+        'Калории', null=True, editable=False, db_index=True)
+    proteins = models.FloatField('Белки', null=True, editable=False)
+    fats = models.FloatField('Жиры', null=True, editable=False)
+    carbohydrates = models.FloatField(
+        'Углеводы', null=True, editable=False)
+    price = models.FloatField(
+        'Примерная стоимость', null=True, editable=False, db_index=True)
+    deleted = models.DateTimeField(
+        'Дата удаления', null=True, editable=False, db_index=True)
+    tags_mask = models.BigIntegerField(
+        'Маска тэгов', default=0, editable=False)
+
+    objects = RecipeManager()
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-popular_score', '-id'),
+                name='recipe_popular_idx'),
+            models.Index(
+                fields=('-trending_score', '-id'),
+                name='recipe_trending_idx'),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self):
         return self.name
 
+    def set_rollups(self, ingredient_amounts):
+        ingredient_amounts = list(ingredient_amounts)
+        for field in Ingredient.ROLLUP_FIELDS:
+            values = [
+                amount * getattr(ingredient, field)
+                for ingredient, amount in ingredient_amounts
+                if getattr(ingredient, field) is not None]
+            setattr(self, field, sum(values) if values else None)
+
+    def set_tags_mask(self, tags):
+        self.tags_mask = Tag.get_mask(tags)
+
 
 class TagRecipe(models.Model):
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
@@ -115,9 +265,12 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         related_name='favorite',
         verbose_name='Любимый рецепт')
+    created = models.DateTimeField('Дата добавления', auto_now_add=True)
 
     class Meta:
         ordering = ('user',)
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'recipe'), name='unique_favorite'),)
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
 
@@ -136,11 +289,128 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name='shopping_cart',
         verbose_name='Рецепт в списке покупок')
+    created = models.DateTimeField('Дата добавления', auto_now_add=True)
 
     class Meta:
         ordering = ('user',)
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'recipe'), name='unique_shopping_cart'),)
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe} в список покупок'
+
+    @classmethod
+    def clear(cls, user):
+        opts = cls._meta
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(opts.db_table)} '
+                f'WHERE {quote(opts.get_field("user").column)} = %s '
+                f'RETURNING {quote(opts.get_field("recipe").column)}',
+                (user.id,))
+            ids = [recipe_id for recipe_id, in cursor.fetchall()]
+        if ids:
+            post_bulk_delete.send(sender=cls, count=len(ids))
+        return ids
+
+
+class ShoppingListJob(models.Model):
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    EXPIRED = 'expired'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+        (EXPIRED, 'Устарело'),
+    )
+    ACTIVE_STATUSES = (PENDING, DONE)
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_jobs',
+        verbose_name='Пользователь')
+    digest = models.CharField(
+        'Хэш содержимого списка покупок', max_length=64)
+    status = models.CharField(
+        'Статус', max_length=16,
+        choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(
+        'Файл списка покупок',
+        upload_to='shopping_lists/', blank=True)
+    created = models.DateTimeField(
+        'Дата создания', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (models.Index(fields=('user', 'digest')),)
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'digest'),
+            condition=models.Q(status__in=('pending', 'done')),
+            name='unique_active_shopping_list_job'),)
+        verbose_name = 'Задача на формирование списка покупок'
+        verbose_name_plural = 'Задачи на формирование списка покупок'
+
+    def __str__(self):
+        return f'Список покупок {self.user} ({self.status})'
+
+
+class StaleRecipe(models.Model):
+    recipe_id = models.BigIntegerField('ID рецепта', unique=True)
+    created = models.DateTimeField('Дата изменения', auto_now_add=True)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Рецепт для пересчета похожих'
+        verbose_name_plural = 'Рецепты для пересчета похожих'
+
+    def __str__(self):
+        return f'Рецепт {self.recipe_id}'
+
+
+class RecipeChange(models.Model):
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shoppingcart'
+    KIND_CHOICES = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+    )
+
+    kind = models.CharField('Тип', max_length=16, choices=KIND_CHOICES)
+    recipe_id = models.BigIntegerField('ID рецепта')
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, db_index=False,
+        related_name='recipe_changes', verbose_name='Пользователь')
+    deleted = models.BooleanField('Удаление', default=False)
+    created = models.DateTimeField('Дата изменения', auto_now_add=True)
+    version = models.BigIntegerField('Версия', null=True, unique=True)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = (
+            models.Index(fields=('kind', 'version')),
+            models.Index(fields=('user', 'version')),
+            models.Index(
+                fields=('id',), condition=models.Q(version__isnull=True),
+                name='recipe_change_pending_idx'),
+        )
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Журнал изменений рецептов'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.recipe_id} ({self.id})'
+
+    @classmethod
+    def log(cls, model, recipe_ids, user_id=None, deleted=False):
+        kind = model._meta.model_name
+        cls.objects.bulk_create(
+            cls(kind=kind, recipe_id=recipe_id, user_id=user_id,
+                deleted=deleted)
+            for recipe_id in recipe_ids)
@@ -0,0 +1,237 @@
+import difflib
+import json
+import random
+import re
+
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token
+
+from . import ranking
+from .models import (
+    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart, Tag,
+    TagRecipe,
+)
+from users.authentication import token_cache
+from users.models import Subscription
+
+User = get_user_model()
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'query_plans.json'
+TAGS_INDEX = 'recipes_tagrecipe_recipe_id_8928dbbc'
+INGREDIENTS_INDEX = 'recipes_ingredientrecipe_recipe_id_18094a5d'
+FAVORITE_INDEX = 'recipes_favorite_user_id_dd4f6854'
+CART_INDEX = 'recipes_shoppingcart_user_id_9cf94f11'
+AUTHOR_INDEX = 'recipes_recipe_author_id_7274f74b'
+RECIPE_PK = 'recipes_recipe_pkey'
+CALORIES_INDEX = 'recipes_recipe_calories_7b90a388'
+PAGE_INDEXES = (TAGS_INDEX, INGREDIENTS_INDEX)
+FLAG_INDEXES = (FAVORITE_INDEX, CART_INDEX)
+SCENARIOS = (
+    ('recipes', '/api/recipes/', False, PAGE_INDEXES),
+    ('recipes_authenticated', '/api/recipes/', True,
+     PAGE_INDEXES + FLAG_INDEXES),
+    ('recipes_tags', '/api/recipes/?tags=tag1&tags=tag2', True,
+     PAGE_INDEXES + FLAG_INDEXES),
+    ('recipes_author', '/api/recipes/?author={author}', True,
+     PAGE_INDEXES + FLAG_INDEXES + (AUTHOR_INDEX,)),
+    ('recipes_favorited', '/api/recipes/?is_favorited=1', True,
+     PAGE_INDEXES + FLAG_INDEXES + (RECIPE_PK,)),
+    ('recipes_in_shopping_cart', '/api/recipes/?is_in_shopping_cart=1', True,
+     PAGE_INDEXES + FLAG_INDEXES + (RECIPE_PK,)),
+    ('recipes_popular', '/api/recipes/?ordering=popular&tags=tag1', True,
+     PAGE_INDEXES + FLAG_INDEXES + ('recipe_popular_idx',)),
+    ('recipes_calories',
+     '/api/recipes/?calories_min=100&calories_max=2000&ordering=calories',
+     True, PAGE_INDEXES + FLAG_INDEXES + (CALORIES_INDEX,)),
+    ('recipes_card', '/api/recipes/?view=card&tags=tag3', True,
+     (TAGS_INDEX,) + FLAG_INDEXES),
+    ('download_shopping_cart', '/api/recipes/download_shopping_cart/', True,
+     (CART_INDEX, RECIPE_PK, INGREDIENTS_INDEX)),
+    ('subscriptions', '/api/users/subscriptions/?recipes_limit=3', True,
+     (AUTHOR_INDEX,)),
+    ('ingredients_search', '/api/ingredients/?name=соль', False, ()),
+)
+INGREDIENT_NAMES = ('соль', 'сахар', 'мука', 'молоко', 'масло', 'яйцо')
+COST_BUDGET = 1.5
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+LISTS = re.compile(r'\((?:\?, )+\?\)')
+
+
+@contextmanager
+def test_database():
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed(recipes_count=1000, random_seed=0):
+    rng = random.Random(random_seed)
+    Tag.objects.bulk_create(
+        Tag(name=f'Тэг {i}', color='#000000', slug=f'tag{i}', bit=i)
+        for i in range(8))
+    Ingredient.objects.bulk_create(
+        Ingredient(
+            name=f'{INGREDIENT_NAMES[i % len(INGREDIENT_NAMES)]} {i}',
+            measurement_unit='г',
+            calories=rng.uniform(0, 9), price=rng.uniform(0, 2))
+        for i in range(recipes_count))
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@example.com',
+             first_name='Имя', last_name='Фамилия', password='!')
+        for i in range(max(recipes_count // 20, 10)))
+    tags = list(Tag.objects.all())
+    ingredients = list(Ingredient.objects.all())
+    users = list(User.objects.order_by('id'))
+    Recipe.objects.bulk_create(
+        Recipe(name=f'Рецепт {i}', image='recipes/images/seed.png',
+               author=rng.choice(users), text='Описание',
+               cooking_time=rng.randint(1, 120))
+        for i in range(recipes_count))
+    recipes = list(Recipe.objects.order_by('id'))
+    TagRecipe.objects.bulk_create(
+        TagRecipe(recipe=recipe, tag=tag) for recipe in recipes
+        for tag in rng.sample(tags, 2))
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(
+            recipe=recipe, ingredient=ingredient,
+            amount=rng.randint(1, 500))
+        for recipe in recipes for ingredient in rng.sample(ingredients, 6))
+    for model in (Favorite, ShoppingCart):
+        model.objects.bulk_create(
+            model(user=user, recipe=recipe) for user in users
+            for recipe in rng.sample(recipes, 10))
+    user = users[0]
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author)
+        for author in rng.sample(users[1:], 8))
+    Recipe.objects.update_rollups()
+    Recipe.objects.update_tags_mask()
+    ranking.refresh()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return {
+        'token': Token.objects.create(user=user).key,
+        'author': users[1].id,
+    }
+
+
+def get_shape(sql):
+    sql = STRINGS.sub('?', sql)
+    sql = NUMBERS.sub('?', sql)
+    return LISTS.sub('(...)', sql)
+
+
+def get_plan_lines(node, depth=0):
+    line = node['Node Type']
+    if 'Index Name' in node:
+        line += f' using {node["Index Name"]}'
+    if 'Relation Name' in node:
+        line += f' on {node["Relation Name"]}'
+    yield '  ' * depth + line
+    for child in node.get('Plans', ()):
+        yield from get_plan_lines(child, depth + 1)
+
+
+def explain(queries):
+    plan, indexes, cost = [], set(), 0
+    with connection.cursor() as cursor:
+        for query in queries:
+            if not query.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + query)
+            root = cursor.fetchone()[0][0]['Plan']
+            lines = list(get_plan_lines(root))
+            plan.extend(lines)
+            indexes.update(
+                line.split(' using ')[1].split(' on ')[0]
+                for line in lines if ' using ' in line)
+            cost += root['Total Cost']
+    return plan, sorted(indexes), cost
+
+
+def run(context):
+    client = Client()
+    auth = {'HTTP_AUTHORIZATION': f'Token {context["token"]}'}
+    jobs = {**settings.SHOPPING_LIST_JOBS, 'BACKEND': ''}
+    results = {}
+    for name, url, authenticated, _ in SCENARIOS:
+        cache.clear()
+        token_cache.clear()
+        with override_settings(SHOPPING_LIST_JOBS=jobs), \
+                CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                url.format(**context), **(auth if authenticated else {}))
+        sql = [query['sql'] for query in queries.captured_queries]
+        result = {
+            'status': response.status_code,
+            'queries': len(sql),
+            'shapes': [get_shape(query) for query in sql],
+        }
+        if connection.vendor == 'postgresql':
+            result['plan'], result['indexes'], cost = explain(sql)
+            result['max_cost'] = round(cost * COST_BUDGET, 2)
+            result['cost'] = round(cost, 2)
+        results[name] = result
+    return results
+
+
+def diff(expected, actual, label):
+    return list(difflib.unified_diff(
+        expected, actual, f'{label} (эталон)', f'{label} (сейчас)',
+        lineterm=''))
+
+
+def compare(expected, actual, indexes=()):
+    problems = []
+    if actual['status'] != 200:
+        problems.append(f'код ответа {actual["status"]}')
+    if actual['queries'] != expected['queries']:
+        problems.append(
+            f'запросов {actual["queries"]} вместо {expected["queries"]}')
+    if actual['shapes'] != expected['shapes']:
+        problems.append('изменился SQL')
+        problems.extend(diff(expected['shapes'], actual['shapes'], 'SQL'))
+    if 'plan' not in expected:
+        return problems
+    missing = set(indexes) - set(actual['indexes'])
+    if missing:
+        problems.append(
+            'не используются индексы: ' + ', '.join(sorted(missing)))
+    if actual['cost'] > expected['max_cost']:
+        problems.append(
+            f'стоимость {actual["cost"]} больше бюджета '
+            f'{expected["max_cost"]}')
+    if problems and actual['plan'] != expected['plan']:
+        problems.extend(diff(expected['plan'], actual['plan'], 'план'))
+    return problems
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(baseline, path=BASELINE_PATH):
+    Path(path).write_text(
+        json.dumps(baseline, ensure_ascii=False, indent=2, sort_keys=True)
+        + '\n')
@@ -0,0 +1,100 @@
+import math
+
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+RANKINGS = {
+    'popular': ('popular_score', 'POPULAR_HALF_LIFE'),
+    'trending': ('trending_score', 'TRENDING_HALF_LIFE'),
+}
+MIN_EXPONENT = -50.0
+
+
+def get_ranking(query_params):
+    ranking = RANKINGS.get(query_params.get('ordering'))
+    return ranking and ranking[0]
+
+
+def get_log_score(weight, created, half_life):
+    age = (created - EPOCH).total_seconds()
+    return math.log(weight) + age * math.log(2) / half_life
+
+
+def log_add(field, value):
+    larger = Greatest(F(field), Value(value))
+    smaller = Least(F(field), Value(value))
+    return Case(
+        When(**{f'{field}__lte': Recipe.NO_SCORE}, then=Value(value)),
+        default=larger + Ln(Value(1.0) + Exp(Greatest(
+            smaller - larger, Value(MIN_EXPONENT)))))
+
+
+def get_weight(model):
+    return settings.RECIPE_RANKINGS['WEIGHTS'][model._meta.model_name]
+
+
+def add_activity(model, recipe_ids, created=None):
+    created = created or timezone.now()
+    options = settings.RECIPE_RANKINGS
+    Recipe.objects.filter(id__in=recipe_ids).update(**{
+        field: log_add(field, get_log_score(
+            get_weight(model), created, options[half_life]))
+        for field, half_life in RANKINGS.values()})
+
+
+def log_sum(first, second):
+    larger, smaller = max(first, second), min(first, second)
+    return larger + math.log1p(math.exp(max(smaller - larger, MIN_EXPONENT)))
+
+
+def get_scores(first_id, last_id):
+    options = settings.RECIPE_RANKINGS
+    scores = defaultdict(dict)
+    for model in (Favorite, ShoppingCart):
+        weight = get_weight(model)
+        rows = model.objects.filter(
+            recipe_id__gte=first_id, recipe_id__lte=last_id,
+        ).values_list('recipe_id', 'created')
+        for recipe_id, created in rows:
+            recipe_scores = scores[recipe_id]
+            for field, half_life in RANKINGS.values():
+                score = get_log_score(weight, created, options[half_life])
+                if field in recipe_scores:
+                    score = log_sum(recipe_scores[field], score)
+                recipe_scores[field] = score
+    return scores
+
+
+def refresh_batch(last_id, batch_size, fields):
+    with transaction.atomic():
+        recipes = list(Recipe.objects.select_for_update().filter(
+            id__gt=last_id).order_by('id').only('id')[:batch_size])
+        if not recipes:
+            return recipes
+        scores = get_scores(recipes[0].id, recipes[-1].id)
+        for recipe in recipes:
+            for field in fields:
+                setattr(recipe, field, scores[recipe.id].get(
+                    field, Recipe.NO_SCORE))
+        Recipe.objects.bulk_update(recipes, fields)
+    return recipes
+
+
+def refresh(batch_size=1000):
+    fields = [field for field, _ in RANKINGS.values()]
+    count = last_id = 0
+    while True:
+        recipes = refresh_batch(last_id, batch_size, fields)
+        count += len(recipes)
+        if len(recipes) < batch_size:
+            return count
+        last_id = recipes[-1].id
@@ -1,12 +1,18 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from drf_base64.fields import Base64ImageField
+from foodgram.serialization import compile_serializer, serialize_many
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
+from rest_framework.reverse import reverse
 
+from . import media
 from .models import (
-    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart, Tag,
+    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart,
+    ShoppingListJob, Tag, TagRecipe,
 )
+from .signals import mark_stale
 from users.serializers import SpecialUserSerializer
 
 
@@ -24,6 +30,21 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShoppingListJob
+        fields = ('id', 'status', 'created', 'download_url')
+
+    def get_download_url(self, obj):
+        if obj.status != ShoppingListJob.DONE:
+            return None
+        return reverse(
+            'recipe-download-shopping-cart-job', kwargs={'job_id': obj.id},
+            request=self.context.get('request'))
+
+
 class RecipeFavoriteSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -39,6 +60,21 @@ class RecipeFavoriteSerializer(serializers.ModelSerializer):
         return data
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    MAX_BATCH_SIZE = 100
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=MAX_BATCH_SIZE)
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class RecipeSyncSerializer(serializers.Serializer):
+    version = serializers.IntegerField(min_value=0, required=False)
+
+
 class RecipeShoppingCartSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -55,29 +91,21 @@ class RecipeShoppingCartSerializer(serializers.ModelSerializer):
 
 
 class IngredientRecipeReadSerializer(serializers.ModelSerializer):
-    id = serializers.SerializerMethodField()
-    name = serializers.SerializerMethodField()
-    measurement_unit = serializers.SerializerMethodField()
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit')
 
     class Meta:
         model = IngredientRecipe
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
-    def get_id(self, obj):
-        return obj.ingredient.id
-
-    def get_name(self, obj):
-        return obj.ingredient.name
-
-    def get_measurement_unit(self, obj):
-        return obj.ingredient.measurement_unit
-
 
 class IngredientRecipeWriteSerializer(serializers.ModelSerializer):
     MIN_AMOUNT_VALUE = 1
     MAX_AMOUNT_VALUE = 32000
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         validators=(MinValueValidator(MIN_AMOUNT_VALUE),
                     MaxValueValidator(MAX_AMOUNT_VALUE)))
@@ -87,7 +115,21 @@ class IngredientRecipeWriteSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount',)
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    CARD_FIELDS = (
+        'id', 'tags', 'is_favorited', 'is_in_shopping_cart',
+        'name', 'image', 'cooking_time')
+
     author = SpecialUserSerializer(read_only=True)
     tags = TagSerializer(many=True)
     ingredients = serializers.SerializerMethodField()
@@ -101,31 +143,82 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time')
 
+    @classmethod
+    def get_requested_fields(cls, query_params):
+        if query_params.get('view') == 'card':
+            return cls.CARD_FIELDS
+        fields = query_params.get('fields')
+        if not fields:
+            return cls.Meta.fields
+        fields = fields.split(',')
+        return tuple(field for field in cls.Meta.fields if field in fields)
+
     @staticmethod
     def get_ingredients(recipe):
-        ingredients = IngredientRecipe.objects.filter(recipe=recipe)
-        return IngredientRecipeReadSerializer(ingredients, many=True).data
+        return serialize_many(
+            IngredientRecipeReadSerializer,
+            recipe.ingredientrecipe_set.all())
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return user.favorite.filter(recipe=recipe).exists()
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return user.shopping_cart.filter(recipe=recipe).exists()
 
 
+class PrimaryKeyListField(serializers.ManyRelatedField):
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(
+            child_relation=serializers.PrimaryKeyRelatedField(
+                queryset=queryset),
+            **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(pk_field.get_prep_value(item))
+            except (TypeError, ValueError):
+                pks.append(TypeError)
+        objects = queryset.in_bulk(
+            [pk for pk in pks if pk is not TypeError])
+        for item, pk in zip(data, pks):
+            if pk is TypeError:
+                child.fail('incorrect_type', data_type=type(item).__name__)
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=item)
+        return [objects[pk] for pk in pks]
+
+
 class RecipeWriteSerializer(serializers.ModelSerializer):
     MIN_COOKING_TIME_VALUE = 1
     MAX_COOKING_TIME_VALUE = 32000
+    INSTANCE_FIELDS = (
+        'id', 'author', 'is_favorited', 'is_in_shopping_cart',
+        'name', 'image', 'text', 'cooking_time')
 
     author = SpecialUserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True)
+    tags = PrimaryKeyListField(queryset=Tag.objects.all())
     ingredients = IngredientRecipeWriteSerializer(many=True)
     image = Base64ImageField()
     cooking_time = serializers.IntegerField(
@@ -138,22 +231,41 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'id', 'tags', 'author', 'ingredients',
             'name', 'image', 'text', 'cooking_time')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prefetched = {}
+
+    @staticmethod
+    def get_missing_message(pk):
+        return serializers.PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'].format(pk_value=pk)
+
     def validate_ingredients(self, value):
         if not value:
             raise ValidationError('Нужно добавить хотя бы один ингредиент!')
-        ingredients_list = []
+        ids = [item['id'] for item in value]
+        ingredients = Ingredient.objects.in_bulk(ids)
+        errors = [
+            {} if pk in ingredients
+            else {'id': [self.get_missing_message(pk)]} for pk in ids]
+        if any(errors):
+            raise ValidationError(errors)
+        if len(set(ids)) != len(ids):
+            raise ValidationError('Ингридиенты не должны повторяться!')
         for item in value:
-            ingredient = get_object_or_404(Ingredient, id=item['id'].id)
-            if ingredient in ingredients_list:
-                raise ValidationError('Ингридиенты не должны повторяться!')
-            ingredients_list.append(ingredient)
+            item['id'] = ingredients[item['id']]
         return value
 
     def validate_tags(self, value):
         if not value:
             raise ValidationError(
                 'Нужно выбрать хотя бы один тэг!')
-        return value
+        return sorted(set(value), key=lambda tag: tag.id)
+
+    def add_tags(self, recipe, tags):
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag=tag) for tag in tags)
+        self.prefetched['tags'] = serialize_many(TagSerializer, tags)
 
     def add_ingredients(self, recipe, ingredients):
         ingredients_recipe = []
@@ -163,28 +275,65 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 ingredient=current_ingredient['id'],
                 amount=current_ingredient['amount']))
         IngredientRecipe.objects.bulk_create(ingredients_recipe)
+        self.prefetched['ingredients'] = serialize_many(
+            IngredientRecipeReadSerializer, ingredients_recipe)
 
+    @staticmethod
+    def set_rollups(recipe, ingredients):
+        recipe.set_rollups(
+            (item['id'], item['amount']) for item in ingredients)
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(author=author, **validated_data)
-        recipe.tags.set(tags)
+        recipe = Recipe(author=author, **validated_data)
+        recipe.set_tags_mask(tags)
+        self.set_rollups(recipe, ingredients)
+        recipe.save()
+        self.add_tags(recipe, tags)
         self.add_ingredients(recipe, ingredients)
+        recipe.is_favorited = False
+        recipe.is_in_shopping_cart = False
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        instance.tags.clear()
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        image = instance.image.name
+        if tags is not None:
+            TagRecipe.objects.filter(recipe=instance).delete()
+            instance.set_tags_mask(tags)
+        if ingredients is not None:
+            IngredientRecipe.objects.filter(recipe=instance).delete()
+            self.set_rollups(instance, ingredients)
         super().update(instance, validated_data)
-        instance.tags.set(tags)
-        self.add_ingredients(instance, ingredients)
+        if instance.image.name != image:
+            media.delete_on_commit([image])
+        if tags is not None:
+            self.add_tags(instance, tags)
+        if ingredients is not None:
+            self.add_ingredients(instance, ingredients)
+        if tags is not None or ingredients is not None:
+            mark_stale(instance.id)
         return instance
 
     def to_representation(self, instance):
-        serializer = RecipeReadSerializer(
-            instance,
-            context={'request': self.context.get('request')})
-        return serializer.data
+        lookups = []
+        if 'tags' not in self.prefetched:
+            lookups.append('tags')
+        if 'ingredients' not in self.prefetched:
+            lookups.append(Prefetch(
+                'ingredientrecipe_set',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient')))
+        prefetch_related_objects([instance], *lookups)
+        fields = RecipeReadSerializer.Meta.fields
+        serializer = RecipeReadSerializer(instance, context={
+            'request': self.context.get('request'),
+            'fields': [
+                name for name in fields if name not in self.prefetched]})
+        data = {**compile_serializer(serializer).data, **self.prefetched}
+        return {name: data[name] for name in fields}
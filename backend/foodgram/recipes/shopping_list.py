@@ -0,0 +1,93 @@
+import datetime as dt
+import hashlib
+import io
+import json
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+
+from .models import IngredientRecipe, ShoppingCart
+
+HEADER_FONT_SIZE = 18
+BODY_FONT_SIZE = 14
+FOOTER_FONT_SIZE = 8
+LEFT_MARGIN = 80
+HEADER_TOP_MARGIN = 770
+HEADER_LINE_SPACE = 30
+HEADER_SECOND_LINE = HEADER_TOP_MARGIN - HEADER_LINE_SPACE
+BODY_TOP_MARGIN = HEADER_SECOND_LINE - HEADER_LINE_SPACE
+BODY_LINE_SPACE = 20
+FOOTER_LINE_SPACE = 10
+
+
+def get_snapshot(user):
+    recipes_ingredients = IngredientRecipe.objects.filter(
+        recipe__shopping_cart__user=user,
+        recipe__deleted__isnull=True).order_by('ingredient')
+    cart = recipes_ingredients.values(
+        'ingredient__name',
+        'ingredient__measurement_unit').annotate(total=Sum('amount'))
+    recipes = ShoppingCart.objects.filter(
+        user=user, recipe__deleted__isnull=True).values_list(
+            'recipe__name', flat=True)
+    return {
+        'full_name': user.get_full_name(),
+        'recipes': list(recipes),
+        'ingredients': [
+            (item['ingredient__name'],
+             item['ingredient__measurement_unit'],
+             item['total']) for item in cart],
+    }
+
+
+def get_digest(snapshot):
+    return hashlib.sha256(
+        json.dumps(snapshot, ensure_ascii=False, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def render(snapshot, file):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase.pdfmetrics import registerFont
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    top_margin = BODY_TOP_MARGIN
+    timestamp = dt.datetime.utcnow() + dt.timedelta(hours=3)
+
+    pdf_file = canvas.Canvas(file, pagesize=A4)
+    registerFont(TTFont('DejaVuSerif', 'DejaVuSerif.ttf'))
+
+    pdf_file.setFont('DejaVuSerif', HEADER_FONT_SIZE)
+    pdf_file.drawString(
+        LEFT_MARGIN, HEADER_TOP_MARGIN,
+        f'Список покупок пользователя {snapshot["full_name"]}')
+    pdf_file.setFont('DejaVuSerif', BODY_FONT_SIZE)
+    pdf_file.drawString(LEFT_MARGIN, HEADER_SECOND_LINE,
+                        'Для приготовления: ' + ', '.join(
+                            snapshot['recipes']))
+    pdf_file.setFont('DejaVuSerif', BODY_FONT_SIZE)
+    for name, unit, total in snapshot['ingredients']:
+        pdf_file.drawString(
+            LEFT_MARGIN, top_margin,
+            u'\u2022' + f' {name} ({unit}) - {total}')
+        top_margin -= BODY_LINE_SPACE
+    pdf_file.setFont('DejaVuSerif', FOOTER_FONT_SIZE)
+    pdf_file.drawString(
+        LEFT_MARGIN,
+        top_margin - FOOTER_LINE_SPACE,
+        'Создано в приложении Foodgram ' + timestamp.strftime(
+            '%d-%m-%Y %H:%M'))
+    pdf_file.drawString(
+        LEFT_MARGIN, top_margin - FOOTER_LINE_SPACE * 2,
+        'Автор: Николай Челюканов')
+
+    pdf_file.showPage()
+    pdf_file.save()
+
+
+def render_to_storage(snapshot, name):
+    buffer = io.BytesIO()
+    render(snapshot, buffer)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
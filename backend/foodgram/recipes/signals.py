@@ -0,0 +1,157 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from foodgram import gateway_cache
+from foodgram.deletion import pre_bulk_delete
+
+from . import media, ranking
+from .models import (
+    Favorite, Ingredient, IngredientRecipe, Recipe, RecipeChange, ShoppingCart,
+    StaleRecipe, Tag, TagRecipe,
+)
+from users.pagination import connect_cached_counts
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+connect_cached_counts(Favorite, Recipe, ShoppingCart, Tag, TagRecipe, User)
+
+
+def mark_stale(*recipe_ids):
+    StaleRecipe.objects.bulk_create(
+        (StaleRecipe(recipe_id=recipe_id) for recipe_id in recipe_ids),
+        ignore_conflicts=True)
+
+
+def purge_recipes(*recipe_ids, listing=False):
+    keys = [gateway_cache.get_key(Recipe, pk) for pk in recipe_ids]
+    if listing:
+        keys.append(gateway_cache.get_key(Recipe))
+    gateway_cache.purge(*keys)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, signal, created=True, **kwargs):
+    if created:
+        mark_stale(instance.id)
+    purge_recipes(instance.id, listing=created)
+    RecipeChange.log(Recipe, (instance.id,), deleted=signal is post_delete)
+
+
+@receiver(pre_bulk_delete, sender=Recipe)
+def recipes_deleted(sender, queryset, **kwargs):
+    ids = list(queryset.values_list('id', flat=True))
+    mark_stale(*ids)
+    purge_recipes(*ids, listing=True)
+    RecipeChange.log(Recipe, ids, deleted=True)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def table_changed(sender, **kwargs):
+    gateway_cache.purge(gateway_cache.get_key(sender))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        gateway_cache.purge(gateway_cache.get_key(User, instance.pk))
+        RecipeChange.log(Recipe, Recipe.objects.filter(
+            author=instance).values_list('id', flat=True))
+
+
+@receiver(pre_bulk_delete)
+def files_bulk_deleted(sender, queryset, **kwargs):
+    fields = media.get_file_fields(sender)
+    if fields and media.is_enabled():
+        media.delete_on_commit([
+            name for row in queryset.values_list(*fields) for name in row])
+
+
+@receiver(post_delete)
+def files_deleted(sender, instance, **kwargs):
+    media.delete_on_commit([
+        getattr(instance, name).name
+        for name in media.get_file_fields(sender)])
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def ingredients_changed(sender, instance, **kwargs):
+    mark_stale(instance.recipe_id)
+    purge_recipes(instance.recipe_id)
+    RecipeChange.log(Recipe, (instance.recipe_id,))
+    Recipe.objects.filter(id=instance.recipe_id).update_rollups()
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        recipes = Recipe.objects.filter(ingredients=instance)
+        recipes.update_rollups()
+        RecipeChange.log(Recipe, recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, created, **kwargs):
+    if not created:
+        RecipeChange.log(Recipe, Recipe.objects.filter(
+            tags=instance).values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    ids = (pk_set or ()) if reverse else (instance.id,)
+    if ids:
+        mark_stale(*ids)
+        purge_recipes(*ids)
+        RecipeChange.log(Recipe, ids)
+
+
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=TagRecipe)
+def tag_relation_changed(sender, instance, **kwargs):
+    RecipeChange.log(Recipe, (instance.recipe_id,))
+    Recipe.objects.filter(id=instance.recipe_id).update_tags_mask()
+
+
+@receiver(m2m_changed, sender=TagRecipe)
+def tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipes = Recipe.objects.filter(id=instance.id)
+    elif pk_set:
+        recipes = Recipe.objects.filter(id__in=pk_set)
+    elif instance.bit is not None:
+        recipes = Recipe.objects.with_tags((instance,))
+    else:
+        return
+    recipes.update_tags_mask()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def activity_added(sender, instance, created, **kwargs):
+    if created:
+        ranking.add_activity(sender, (instance.recipe_id,), instance.created)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def relation_logged(sender, instance, signal, created=True, **kwargs):
+    if created:
+        RecipeChange.log(
+            sender, (instance.recipe_id,), user_id=instance.user_id,
+            deleted=signal is post_delete)
@@ -0,0 +1,241 @@
+import os
+import shutil
+
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+
+from django.conf import settings
+from scipy import sparse
+
+from .models import IngredientRecipe, Recipe, StaleRecipe
+
+ARRAYS = ('ids', 'neighbours', 'scores')
+
+
+def get_root():
+    return Path(settings.SIMILARITY['PATH'])
+
+
+def get_features():
+    ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True),
+        dtype=np.int64)
+    ingredients = np.array(
+        IngredientRecipe.objects.values_list('recipe_id', 'ingredient_id'),
+        dtype=np.int64).reshape(-1, 2)
+    tags = np.array(
+        Recipe.tags.through.objects.values_list('recipe_id', 'tag_id'),
+        dtype=np.int64).reshape(-1, 2)
+    offset = ingredients[:, 1].max(initial=0) + 1
+    pairs = np.concatenate((ingredients, tags + (0, offset)))
+    weights = np.concatenate((
+        np.ones(len(ingredients), dtype=np.float32),
+        np.full(len(tags), settings.SIMILARITY['TAG_WEIGHT'],
+                dtype=np.float32)))
+    known = np.isin(pairs[:, 0], ids)
+    rows = np.searchsorted(ids, pairs[:, 0])
+    matrix = sparse.csr_matrix(
+        (weights[known], (rows[known], pairs[known, 1])),
+        shape=(len(ids), pairs[:, 1].max(initial=0) + 1))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return ids, sparse.diags(1 / norms) @ matrix
+
+
+def get_batches(matrix, rows):
+    options = settings.SIMILARITY
+    binary = matrix.copy()
+    binary.data[:] = 1
+    counts = np.asarray(binary.sum(axis=0)).ravel()
+    costs = np.cumsum(binary[rows] @ counts)
+    bounds = np.flatnonzero(np.diff(costs // options['BATCH_NNZ'])) + 1
+    for batch in np.split(rows, bounds):
+        for start in range(0, len(batch), options['BATCH_SIZE']):
+            yield batch[start:start + options['BATCH_SIZE']]
+
+
+def get_similarities(matrix, rows):
+    transposed = matrix.T.tocsr()
+    for batch in get_batches(matrix, rows):
+        similarities = (matrix[batch] @ transposed).tocsr()
+        entries = np.repeat(batch, np.diff(similarities.indptr))
+        similarities.data[similarities.indices == entries] = 0
+        similarities.eliminate_zeros()
+        for row, start, end in zip(
+                batch, similarities.indptr[:-1], similarities.indptr[1:]):
+            yield (row, similarities.indices[start:end],
+                   similarities.data[start:end])
+
+
+def get_top(columns, similarities, top_k):
+    if len(similarities) > top_k:
+        top = np.argpartition(-similarities, top_k - 1)[:top_k]
+        columns, similarities = columns[top], similarities[top]
+    order = np.lexsort((columns, -similarities))
+    return columns[order], similarities[order]
+
+
+def compute(ids, matrix, rows, neighbours, scores):
+    top_k = neighbours.shape[1]
+    for row, columns, similarities in get_similarities(matrix, rows):
+        columns, similarities = get_top(columns, similarities, top_k)
+        neighbours[row] = -1
+        scores[row] = 0
+        neighbours[row, :len(columns)] = ids[columns]
+        scores[row, :len(columns)] = similarities
+
+
+def merge(ids, matrix, rows, computed, neighbours, scores):
+    skip = np.zeros(len(ids), dtype=bool)
+    skip[computed] = True
+    minimums = scores.min(axis=1)
+    for row, columns, similarities in get_similarities(matrix, rows):
+        mask = (similarities > minimums[columns]) & ~skip[columns]
+        targets = columns[mask]
+        if not len(targets):
+            continue
+        candidates = np.column_stack((
+            neighbours[targets], np.full(len(targets), ids[row])))
+        candidate_scores = np.column_stack((
+            scores[targets], similarities[mask]))
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        order = order[:, :neighbours.shape[1]]
+        neighbours[targets] = np.take_along_axis(candidates, order, axis=1)
+        scores[targets] = np.take_along_axis(
+            candidate_scores, order, axis=1)
+        minimums[targets] = scores[targets].min(axis=1)
+
+
+def build(top_k=None):
+    ids, matrix = get_features()
+    top_k = top_k or settings.SIMILARITY['TOP_K']
+    neighbours = np.full((len(ids), top_k), -1, dtype=np.int64)
+    scores = np.zeros((len(ids), top_k), dtype=np.float32)
+    compute(ids, matrix, np.arange(len(ids)), neighbours, scores)
+    save(ids, neighbours, scores)
+    return len(ids)
+
+
+def update(stale_ids):
+    index = load()
+    if index is None:
+        return build()
+    old_ids, old_neighbours, old_scores = index
+    ids, matrix = get_features()
+    top_k = old_neighbours.shape[1]
+    neighbours = np.full((len(ids), top_k), -1, dtype=np.int64)
+    scores = np.zeros((len(ids), top_k), dtype=np.float32)
+    kept = np.isin(ids, old_ids)
+    positions = np.searchsorted(old_ids, ids[kept])
+    neighbours[kept] = old_neighbours[positions]
+    scores[kept] = old_scores[positions]
+    changed = np.union1d(
+        np.asarray(stale_ids, dtype=np.int64),
+        np.setxor1d(ids, old_ids))
+    stale = np.flatnonzero(np.isin(ids, changed))
+    affected = np.flatnonzero(
+        np.isin(neighbours, changed).any(axis=1) | ~kept)
+    rows = np.union1d(stale, affected)
+    compute(ids, matrix, rows, neighbours, scores)
+    merge(ids, matrix, stale, rows, neighbours, scores)
+    save(ids, neighbours, scores)
+    return len(rows)
+
+
+def refresh(full=False):
+    queue = list(StaleRecipe.objects.values_list('id', 'recipe_id'))
+    recipe_ids = [recipe_id for _, recipe_id in queue]
+    StaleRecipe.objects.filter(id__in=[pk for pk, _ in queue]).delete()
+    try:
+        return build() if full else update(recipe_ids)
+    except Exception:
+        StaleRecipe.objects.bulk_create(
+            (StaleRecipe(recipe_id=recipe_id) for recipe_id in recipe_ids),
+            ignore_conflicts=True)
+        raise
+
+
+def save(ids, neighbours, scores):
+    root = get_root()
+    version = uuid4().hex
+    (root / version).mkdir(parents=True)
+    for name, array in zip(ARRAYS, (ids, neighbours, scores)):
+        np.save(root / version / f'{name}.npy', array)
+    previous = get_version()
+    current = root / 'CURRENT.tmp'
+    current.write_text(version)
+    os.replace(current, root / 'CURRENT')
+    for path in root.iterdir():
+        if path.is_dir() and path.name not in (version, previous):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def get_version():
+    try:
+        return (get_root() / 'CURRENT').read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+class Index:
+
+    def __init__(self):
+        self.version = None
+        self.arrays = None
+
+    def get(self):
+        version = get_version()
+        if version is None:
+            return None
+        if version != self.version:
+            self.arrays = tuple(
+                np.load(get_root() / version / f'{name}.npy', mmap_mode='r')
+                for name in ARRAYS)
+            self.version = version
+        return self.arrays
+
+
+index = Index()
+
+
+def load():
+    arrays = index.get()
+    if arrays is None:
+        return None
+    return tuple(np.array(array) for array in arrays)
+
+
+def get_positions(ids, recipe_ids):
+    recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+    positions = np.searchsorted(ids, recipe_ids)
+    positions = positions[positions < len(ids)]
+    return positions[np.isin(ids[positions], recipe_ids)]
+
+
+def get_similar(recipe_id, limit):
+    arrays = index.get()
+    if arrays is None:
+        return None
+    ids, neighbours, _ = arrays
+    positions = get_positions(ids, (recipe_id,))
+    if not len(positions):
+        return None
+    row = neighbours[positions[0], :limit]
+    return [int(neighbour) for neighbour in row if neighbour >= 0]
+
+
+def get_recommended(recipe_ids, limit):
+    arrays = index.get()
+    if arrays is None:
+        return []
+    ids, neighbours, scores = arrays
+    positions = get_positions(ids, recipe_ids)
+    candidates = neighbours[positions].ravel()
+    candidate_scores = scores[positions].ravel()
+    mask = (candidates >= 0) & ~np.isin(candidates, recipe_ids)
+    candidates, inverse = np.unique(candidates[mask], return_inverse=True)
+    totals = np.bincount(inverse, weights=candidate_scores[mask])
+    order = np.lexsort((candidates, -totals))[:limit]
+    return [int(candidate) for candidate in candidates[order]]
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max, Min, Q
+
+from .models import RecipeChange
+
+LOCK_ID = 7_301_045
+
+GROUPS = {
+    RecipeChange.RECIPE: ('recipes', 'upserted', 'deleted'),
+    RecipeChange.FAVORITE: ('favorites', 'added', 'removed'),
+    RecipeChange.SHOPPING_CART: ('shopping_cart', 'added', 'removed'),
+}
+
+
+def lock():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (LOCK_ID,))
+
+
+def get_version():
+    version = RecipeChange.objects.aggregate(
+        version=Max('version'))['version']
+    return version or 0
+
+
+def publish():
+    pending = RecipeChange.objects.filter(version__isnull=True)
+    if not pending.exists():
+        return 0
+    with transaction.atomic():
+        lock()
+        first = pending.aggregate(first=Min('id'))['first']
+        if first is None:
+            return 0
+        offset = max(get_version() - first + 1, 0)
+        return pending.filter(id__gte=first).update(
+            version=F('id') + offset)
+
+
+def get_changes(user, version=None, limit=None):
+    publish()
+    result = {
+        'version': version,
+        'reset': version is None,
+        'has_more': False,
+    }
+    for group, added, removed in GROUPS.values():
+        result[group] = {added: [], removed: []}
+    if version is None:
+        result['version'] = get_version()
+        return result
+    limit = limit or settings.RECIPE_SYNC['PAGE_SIZE']
+    query = Q(kind=RecipeChange.RECIPE)
+    if user.is_authenticated:
+        query |= Q(user=user)
+    changes = list(RecipeChange.objects.filter(
+        query, version__gt=version,
+    ).order_by('version').values_list(
+        'version', 'kind', 'recipe_id', 'deleted')[:limit + 1])
+    result['has_more'] = len(changes) > limit
+    changes = changes[:limit]
+    states = {}
+    for change_version, kind, recipe_id, deleted in changes:
+        states.pop((kind, recipe_id), None)
+        states[kind, recipe_id] = deleted
+        result['version'] = change_version
+    for (kind, recipe_id), deleted in states.items():
+        group, added, removed = GROUPS[kind]
+        result[group][removed if deleted else added].append(recipe_id)
+    return result
+
+
+def compact():
+    published = RecipeChange.objects.filter(version__isnull=False)
+    latest = published.order_by().values(
+        'kind', 'recipe_id', 'user',
+    ).annotate(latest=Max('version')).values('latest')
+    deleted, _ = published.exclude(version__in=latest).delete()
+    return deleted
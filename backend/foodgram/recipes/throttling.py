@@ -0,0 +1,110 @@
+import math
+import time
+
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+class MemoryBucketBackend:
+    shared = False
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.buckets = OrderedDict()
+        self.lock = Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+            if not wait:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_size:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+class CacheBucketBackend:
+
+    def __init__(self, cache_alias=None):
+        cache_alias = cache_alias or settings.THROTTLE_BUCKETS['CACHE']
+        self.cache = caches[cache_alias]
+        if isinstance(
+                self.cache, (DatabaseCache, DummyCache, FileBasedCache)):
+            raise ImproperlyConfigured(
+                f'Кэш {cache_alias} не поддерживает атомарный incr, '
+                f'нужен memcached или Redis.')
+
+    @property
+    def shared(self):
+        return not isinstance(self.cache, LocMemCache)
+
+    def consume(self, key, capacity, refill_rate):
+        period = capacity / refill_rate
+        window, offset = divmod(time.time(), period)
+        current = f'{key}:{int(window)}'
+        timeout = math.ceil(2 * period)
+        self.cache.add(current, 0, timeout)
+        count = self.cache.incr(current)
+        previous = self.cache.get(f'{key}:{int(window) - 1}', 0)
+        weight = 1 - offset / period
+        if previous * weight + count <= capacity:
+            return 0
+        self.cache.decr(current)
+        if count > capacity:
+            return period - offset
+        return (previous * weight + count - capacity) * period / previous
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    options = settings.THROTTLE_BUCKETS
+    backend = import_string(options['BACKEND'])()
+    if options['WORKERS'] > 1 and not backend.shared:
+        raise ImproperlyConfigured(
+            f'{options["BACKEND"]} не разделяет лимиты между '
+            f'процессами, а воркеров {options["WORKERS"]}. Укажите '
+            f'recipes.throttling.CacheBucketBackend и общий кэш '
+            f'в THROTTLE_CACHE.')
+    return backend
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def get_ident(self, request):
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        capacity, refill_rate = settings.THROTTLE_BUCKETS['RATES'][self.scope]
+        self.wait_time = get_backend().consume(
+            f'throttle:{self.scope}:{self.get_ident(request)}',
+            capacity, refill_rate)
+        return not self.wait_time
+
+    def wait(self):
+        return math.ceil(self.wait_time)
+
+
+class ToggleThrottle(TokenBucketThrottle):
+    scope = 'toggle'
+
+
+class RecipeWriteThrottle(TokenBucketThrottle):
+    scope = 'recipe_write'
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet
 
 router_v1 = DefaultRouter()
@@ -8,7 +10,17 @@ router_v1.register('recipes', RecipeViewSet)
 router_v1.register('tags', TagViewSet)
 router_v1.register('ingredients', IngredientViewSet)
 
+async_urlpatterns = [
+    path('recipes/', async_views.recipe_list),
+    path('recipes/<int:pk>/', async_views.recipe_detail),
+    path('tags/', async_views.tag_list),
+    path('tags/<int:pk>/', async_views.tag_detail),
+    path('ingredients/', async_views.ingredient_list),
+    path('ingredients/<int:pk>/', async_views.ingredient_detail),
+]
+
+urlpatterns = async_urlpatterns if settings.ASYNC_READ_API else []
 
-urlpatterns = [
+urlpatterns += [
     path('', include(router_v1.urls))
 ]
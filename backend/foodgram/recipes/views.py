@@ -1,59 +1,147 @@
-import datetime as dt
-
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase.pdfmetrics import registerFont
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from foodgram.gateway_cache import SurrogateKeyMixin, add_keys, get_key
+from foodgram.parsers import MultiPartJSONParser
+from foodgram.serialization import CompiledSerializerMixin
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from . import jobs, ranking
+from .deletion import delete_recipes
 from .filters import RecipeFilter
 from .models import (
-    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart, Tag,
+    Favorite, Ingredient, Recipe, RecipeChange, ShoppingCart, ShoppingListJob,
+    Tag,
 )
 from .permissions import IsAuthorAdminOrReadOnlyPermission
 from .serializers import (
-    IngredientSerializer, RecipeFavoriteSerializer, RecipeReadSerializer,
-    RecipeShoppingCartSerializer, RecipeWriteSerializer, TagSerializer,
+    IngredientSerializer, RecipeBatchSerializer, RecipeFavoriteSerializer,
+    RecipeReadSerializer, RecipeShoppingCartSerializer, RecipeSyncSerializer,
+    RecipeWriteSerializer, ShoppingListJobSerializer, TagSerializer,
+)
+from .shopping_list import get_snapshot, render
+from .sync import get_changes
+from .throttling import RecipeWriteThrottle, ToggleThrottle
+from users.pagination import (
+    CachedCount, KeysetPagination, invalidate_cached_counts,
 )
+from users.subscriptions import load_subscriptions
+
+User = get_user_model()
+
 
+def add_recipe_keys(request, recipes, many=True):
+    keys = {get_key(Tag), get_key(Ingredient)}
+    if many:
+        keys.add(get_key(Recipe))
+    for recipe in recipes:
+        keys.add(get_key(Recipe, recipe.id))
+        keys.add(get_key(User, recipe.author_id))
+    add_keys(request, *keys)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(
+        SurrogateKeyMixin, CompiledSerializerMixin,
+        viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    compiled_rows = True
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+        SurrogateKeyMixin, CompiledSerializerMixin,
+        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
+    compiled_rows = True
     filter_backends = (filters.SearchFilter,)
     search_fields = ('^name',)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CompiledSerializerMixin, viewsets.ModelViewSet):
     http_method_names = ('get', 'post', 'patch', 'delete')
     permission_classes = (IsAuthorAdminOrReadOnlyPermission,)
+    parser_classes = (JSONParser, FormParser, MultiPartJSONParser)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     queryset = Recipe.objects.all()
+    pagination_count_strategy = CachedCount()
+    compiled_actions = (
+        'list', 'retrieve', 'similar', 'recommended', 'sync')
+    similar_limit = 10
+
+    def get_requested_fields(self):
+        return RecipeReadSerializer.get_requested_fields(
+            self.request.query_params)
+
+    def get_queryset(self):
+        if self.action == 'partial_update':
+            return Recipe.objects.for_fields(
+                RecipeWriteSerializer.INSTANCE_FIELDS, self.request.user)
+        if self.action not in self.compiled_actions:
+            return super().get_queryset()
+        return Recipe.objects.for_fields(
+            self.get_requested_fields(), self.request.user)
+
+    def prefetch_subscriptions(self, recipes):
+        if 'author' in self.get_requested_fields():
+            load_subscriptions(
+                self.request, {recipe.author_id for recipe in recipes})
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.prefetch_subscriptions(page)
+            add_recipe_keys(self.request, page)
+        return page
+
+    def get_object(self):
+        recipe = super().get_object()
+        add_recipe_keys(self.request, (recipe,), many=False)
+        return recipe
+
+    @property
+    def paginator(self):
+        field = ranking.get_ranking(self.request.query_params)
+        if self.action != 'list' or field is None:
+            return super().paginator
+        if not hasattr(self, '_paginator'):
+            self._paginator = KeysetPagination(field)
+        return self._paginator
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.compiled_actions:
+            context['fields'] = self.get_requested_fields()
+        return context
 
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
             return RecipeWriteSerializer
         return RecipeReadSerializer
 
+    def get_throttles(self):
+        if self.action in ('create', 'partial_update'):
+            return (RecipeWriteThrottle(),)
+        return super().get_throttles()
+
+    def perform_destroy(self, instance):
+        delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
     @action(
         detail=True,
         methods=('post', 'delete'),
-        permission_classes=(IsAuthenticated,))
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,))
     def favorite(self, request, **kwargs):
         user = request.user
         recipe_id = self.kwargs.get('pk')
@@ -79,7 +167,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=True,
         methods=('post', 'delete'),
-        permission_classes=(IsAuthenticated,))
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,))
     def shopping_cart(self, request, **kwargs):
         user = request.user
         recipe_id = self.kwargs.get('pk')
@@ -103,70 +192,172 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    def get_similar_limit(self):
+        try:
+            limit = int(self.request.query_params.get(
+                'limit', self.similar_limit))
+        except ValueError:
+            limit = self.similar_limit
+        return max(1, min(limit, settings.SIMILARITY['TOP_K']))
+
+    def get_recipes(self, ids):
+        recipes = self.get_queryset().in_bulk(ids)
+        recipes = [
+            recipes[recipe_id] for recipe_id in ids if recipe_id in recipes]
+        self.prefetch_subscriptions(recipes)
+        return recipes
+
+    def get_recipes_response(self, ids):
+        recipes = self.get_recipes(ids)
+        add_recipe_keys(self.request, recipes)
+        serializer = self.get_serializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=('get',))
+    def similar(self, request, pk=None):
+        from . import similarity
+
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        ids = similarity.get_similar(recipe_id, self.get_similar_limit())
+        if ids is None:
+            get_object_or_404(Recipe, pk=recipe_id)
+            ids = []
+        return self.get_recipes_response(ids)
+
     @action(
         detail=False,
         methods=('get',),
         permission_classes=(IsAuthenticated,))
-    def download_shopping_cart(self, request):
-        HEADER_FONT_SIZE = 18
-        BODY_FONT_SIZE = 14
-        FOOTER_FONT_SIZE = 8
-        LEFT_MARGIN = 80
-        HEADER_TOP_MARGIN = 770
-        HEADER_LINE_SPACE = 30
-        HEADER_SECOND_LINE = HEADER_TOP_MARGIN - HEADER_LINE_SPACE
-        BODY_TOP_MARGIN = HEADER_SECOND_LINE - HEADER_LINE_SPACE
-        BODY_LINE_SPACE = 20
-        FOOTER_LINE_SPACE = 10
-
-        recipes_ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user).order_by('ingredient')
-        cart = recipes_ingredients.values(
-            'ingredient__name',
-            'ingredient__measurement_unit').annotate(total=Sum('amount'))
-        recipes = ShoppingCart.objects.filter(
-            user=request.user).values('recipe__name')
-
-        shopping_list = []
-        for ingredient in cart:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            total = ingredient['total']
-            line = u'\u2022' + f' {name} ({unit}) - {total}'
-            shopping_list.append(line)
-
-        recipes_list = []
-        for recipe in recipes:
-            recipes_list.append(recipe['recipe__name'])
-
-        timestamp = dt.datetime.utcnow() + dt.timedelta(hours=3)
+    def recommended(self, request):
+        from . import similarity
+
+        favorites = request.user.favorite.order_by('-id').values_list(
+            'recipe_id', flat=True)[:settings.SIMILARITY['FAVORITES_LIMIT']]
+        ids = similarity.get_recommended(
+            list(favorites), self.get_similar_limit())
+        return self.get_recipes_response(ids)
+
+    @action(detail=False, methods=('get',))
+    def sync(self, request):
+        serializer = RecipeSyncSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        changes = get_changes(
+            request.user, serializer.validated_data.get('version'))
+        recipes = changes['recipes']
+        found = self.get_recipes(recipes['upserted'])
+        ids = {recipe.id for recipe in found}
+        recipes['deleted'].extend(
+            recipe_id for recipe_id in recipes['upserted']
+            if recipe_id not in ids)
+        recipes['upserted'] = self.get_serializer(found, many=True).data
+        return Response(changes)
+
+    def update_relations(self, request, model):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user = request.user
+        found = dict(Recipe.objects.filter(id__in=ids).annotate(
+            added=Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        ).values_list('id', 'added'))
+        if request.method == 'POST':
+            changed = {
+                recipe_id for recipe_id, added in found.items() if not added}
+            model.objects.bulk_create(
+                (model(user=user, recipe_id=recipe_id)
+                 for recipe_id in changed),
+                ignore_conflicts=True)
+            if changed:
+                ranking.add_activity(model, changed)
+                RecipeChange.log(model, changed, user_id=user.id)
+                invalidate_cached_counts(model)
+            outcomes = ('added', 'already_added')
+        else:
+            changed = {
+                recipe_id for recipe_id, added in found.items() if added}
+            model.objects.filter(user=user, recipe_id__in=changed).delete()
+            outcomes = ('removed', 'not_added')
+        results = []
+        for recipe_id in ids:
+            if recipe_id not in found:
+                outcome = 'not_found'
+            elif recipe_id in changed:
+                outcome = outcomes[0]
+            else:
+                outcome = outcomes[1]
+            results.append({'id': recipe_id, 'status': outcome})
+        return Response({'results': results})
 
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='favorite',
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,))
+    def favorite_batch(self, request):
+        return self.update_relations(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='shopping_cart',
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,))
+    def shopping_cart_batch(self, request):
+        return self.update_relations(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=('delete',),
+        url_path='shopping_cart/clear',
+        permission_classes=(IsAuthenticated,))
+    def clear_shopping_cart(self, request):
+        user = request.user
+        ids = ShoppingCart.clear(user)
+        if ids:
+            RecipeChange.log(
+                ShoppingCart, ids, user_id=user.id, deleted=True)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,))
+    def download_shopping_cart(self, request):
+        if jobs.is_enabled():
+            job = jobs.enqueue(request.user)
+            serializer = ShoppingListJobSerializer(
+                job, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         response = HttpResponse(content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="My_list.pdf"'
-        pdf_file = canvas.Canvas(response, pagesize=A4)
-        registerFont(TTFont('DejaVuSerif', 'DejaVuSerif.ttf'))
-
-        pdf_file.setFont('DejaVuSerif', HEADER_FONT_SIZE)
-        pdf_file.drawString(
-            LEFT_MARGIN, HEADER_TOP_MARGIN,
-            f'Список покупок пользователя {request.user.get_full_name()}')
-        pdf_file.setFont('DejaVuSerif', BODY_FONT_SIZE)
-        pdf_file.drawString(LEFT_MARGIN, HEADER_SECOND_LINE,
-                            'Для приготовления: ' + ', '.join(recipes_list))
-        pdf_file.setFont('DejaVuSerif', BODY_FONT_SIZE)
-        for ingredient in shopping_list:
-            pdf_file.drawString(LEFT_MARGIN, BODY_TOP_MARGIN, ingredient)
-            BODY_TOP_MARGIN -= BODY_LINE_SPACE
-        pdf_file.setFont('DejaVuSerif', FOOTER_FONT_SIZE)
-        pdf_file.drawString(
-            LEFT_MARGIN,
-            BODY_TOP_MARGIN - FOOTER_LINE_SPACE,
-            'Создано в приложении Foodgram ' + timestamp.strftime(
-                '%d-%m-%Y %H:%M'))
-        pdf_file.drawString(
-            LEFT_MARGIN, BODY_TOP_MARGIN - FOOTER_LINE_SPACE * 2,
-            'Автор: Николай Челюканов')
-
-        pdf_file.showPage()
-        pdf_file.save()
+        render(get_snapshot(request.user), response)
         return response
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+        url_path=r'shopping_cart_jobs/(?P<job_id>\d+)')
+    def shopping_cart_job(self, request, job_id):
+        job = get_object_or_404(
+            ShoppingListJob, id=job_id, user=request.user)
+        serializer = ShoppingListJobSerializer(
+            job, context={'request': request})
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+        url_path=r'shopping_cart_jobs/(?P<job_id>\d+)/download')
+    def download_shopping_cart_job(self, request, job_id):
+        job = get_object_or_404(
+            ShoppingListJob, id=job_id, user=request.user,
+            status=ShoppingListJob.DONE)
+        return FileResponse(
+            job.file.open('rb'), as_attachment=True, filename='My_list.pdf')
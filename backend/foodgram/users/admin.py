@@ -1,18 +1,31 @@
 from django.contrib import admin
+from foodgram.deletion import BulkDeletionAdminMixin
 
 from .models import Subscription, User
+from .pagination import EstimatedCountPaginator
+from recipes.admin_filters import AutocompleteFilter, AutocompleteFilterMixin
+from recipes.deletion import delete_users
 
 
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(BulkDeletionAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'username', 'email',
-                    'first_name', 'last_name', 'is_staff')
-    list_filter = ('email', 'username')
+                    'first_name', 'last_name', 'is_staff', 'deleted')
     search_fields = ('username', 'first_name', 'last_name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
+    def bulk_delete(self, queryset):
+        return delete_users(queryset)
 
-class SubscriptionAdmin(admin.ModelAdmin):
+
+class SubscriptionAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'author')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    list_filter = (AutocompleteFilter.for_field('user'),
+                   AutocompleteFilter.for_field('author'))
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Subscription, SubscriptionAdmin)
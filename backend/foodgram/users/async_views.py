@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from django.shortcuts import get_object_or_404
+from foodgram.asynchronous import (
+    json_response, paginate, paginated_response, read_only_view, run_in_thread,
+)
+from foodgram.serialization import compile_serializer
+
+from .models import Subscription
+from .serializers import SpecialUserSerializer, SubscribeSerializer
+from .views import SpecialUserViewSet
+
+User = get_user_model()
+
+
+def get_users(request):
+    queryset = User.objects.filter(deleted__isnull=True)
+    user = request.user
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(is_subscribed=Exists(
+        Subscription.objects.filter(user=user, author=OuterRef('pk'))))
+
+
+@read_only_view(
+    SpecialUserViewSet.as_view({'get': 'list', 'post': 'create'}),
+    require_auth=True)
+async def user_list(request):
+    pagination, users = await paginate(
+        request, get_users(request), view=SpecialUserViewSet)
+    data = compile_serializer(SpecialUserSerializer(
+        users, many=True, context={'request': request})).data
+    return paginated_response(pagination, data)
+
+
+@read_only_view(SpecialUserViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+     'delete': 'destroy'}))
+async def user_detail(request, id):
+    user = await run_in_thread(
+        lambda: get_object_or_404(get_users(request), id=id))
+    data = compile_serializer(
+        SpecialUserSerializer(user, context={'request': request})).data
+    return json_response(data)
+
+
+@read_only_view(
+    SpecialUserViewSet.as_view({'get': 'subscriptions'}), require_auth=True)
+async def subscriptions(request):
+    queryset = User.objects.filter(
+        following__user=request.user,
+        deleted__isnull=True).prefetch_related('recipes')
+    pagination, authors = await paginate(
+        request, queryset, view=SpecialUserViewSet)
+    for author in authors:
+        author.is_subscribed = True
+    data = await run_in_thread(
+        lambda: compile_serializer(SubscribeSerializer(
+            authors, many=True, context={'request': request})).data)
+    return paginated_response(pagination, data)
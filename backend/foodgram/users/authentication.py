@@ -0,0 +1,191 @@
+import hashlib
+import time
+import uuid
+
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from foodgram.deletion import pre_bulk_delete
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+NON_INVALIDATING_FIELDS = {'last_login'}
+CACHED_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'username', 'email', 'first_name', 'last_name', 'is_active',
+        'is_staff', 'is_superuser', 'deleted'})
+
+
+class TokenCache:
+
+    def __init__(self, max_size=10000, timeout=60, shared_cache=None,
+                 shared_timeout=300, workers=1):
+        self.shared_cache = caches[shared_cache] if shared_cache else None
+        self.local = self.shared_cache is not None or workers <= 1
+        self.max_size = max_size
+        self.timeout = timeout
+        self.shared_timeout = shared_timeout
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = self.shared_hits = self.misses = 0
+
+    @staticmethod
+    def get_shared_key(key):
+        return 'token-auth-v3:' + hashlib.sha256(key.encode()).hexdigest()
+
+    @staticmethod
+    def pack(user):
+        return tuple(getattr(user, name) for name in CACHED_FIELDS)
+
+    @staticmethod
+    def unpack(values):
+        return User.from_db(None, CACHED_FIELDS, values)
+
+    @staticmethod
+    def get_generation_key(user_id):
+        return f'token-auth-user:{user_id}'
+
+    def get_generation(self, user_id):
+        if self.shared_cache is None:
+            return None
+        key = self.get_generation_key(user_id)
+        generation = self.shared_cache.get(key)
+        if generation is None:
+            self.shared_cache.add(key, uuid.uuid4().hex, None)
+            generation = self.shared_cache.get(key)
+        return generation
+
+    def is_current(self, values, generation):
+        if self.shared_cache is None:
+            return True
+        return generation is not None and generation == self.shared_cache.get(
+            self.get_generation_key(values[CACHED_FIELDS.index('id')]))
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[1] > now and self.is_current(
+                entry[0], entry[2]):
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+            self.hits += 1
+            return self.unpack(entry[0])
+        with self.lock:
+            self.entries.pop(key, None)
+        if self.shared_cache is not None:
+            cached = self.shared_cache.get(self.get_shared_key(key))
+            if cached is not None and self.is_current(*cached):
+                self.shared_hits += 1
+                self.set_local(key, *cached)
+                return self.unpack(cached[0])
+        self.misses += 1
+        return None
+
+    def set_local(self, key, values, generation):
+        if not self.local:
+            return
+        with self.lock:
+            self.entries[key] = (
+                values, time.monotonic() + self.timeout, generation)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def set(self, key, user):
+        values = self.pack(user)
+        generation = self.get_generation(user.pk)
+        self.set_local(key, values, generation)
+        if self.shared_cache is not None:
+            self.shared_cache.set(
+                self.get_shared_key(key), (values, generation),
+                self.shared_timeout)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if self.shared_cache is not None:
+            self.shared_cache.delete_many(
+                [self.get_shared_key(key) for key in keys])
+
+    def bump(self, *user_ids):
+        if self.shared_cache is not None:
+            self.shared_cache.set_many({
+                self.get_generation_key(user_id): uuid.uuid4().hex
+                for user_id in user_ids}, None)
+
+    def delete_token(self, key, user_id):
+        self.bump(user_id)
+        self.delete(key)
+
+    def delete_user(self, *user_ids):
+        self.bump(*user_ids)
+        keys = set(Token.objects.filter(
+            user_id__in=user_ids).values_list('key', flat=True))
+        with self.lock:
+            keys.update(key for key, (values, *_) in self.entries.items()
+                        if values[CACHED_FIELDS.index('id')] in user_ids)
+        if keys:
+            self.delete(*keys)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        requests = self.hits + self.shared_hits + self.misses
+        return {
+            'local': self.local,
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (
+                (self.hits + self.shared_hits) / requests if requests else 0),
+        }
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_AUTH_CACHE['MAX_SIZE'],
+    timeout=settings.TOKEN_AUTH_CACHE['TIMEOUT'],
+    shared_cache=settings.TOKEN_AUTH_CACHE['SHARED_CACHE'],
+    shared_timeout=settings.TOKEN_AUTH_CACHE['SHARED_TIMEOUT'],
+    workers=settings.TOKEN_AUTH_CACHE['WORKERS'])
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is not None:
+            return user, Token(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user)
+        return user, token
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.delete_token(instance.key, instance.user_id)
+
+
+@receiver(pre_bulk_delete, sender=User)
+def invalidate_deleted_users(sender, queryset, **kwargs):
+    token_cache.delete_user(*queryset.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) - NON_INVALIDATING_FIELDS:
+        token_cache.delete_user(instance.pk)
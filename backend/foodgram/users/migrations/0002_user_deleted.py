@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deleted',
+            field=models.DateTimeField(db_index=True, editable=False, null=True, verbose_name='Дата удаления'),
+        ),
+    ]
@@ -27,6 +27,8 @@ class User(AbstractUser):
         'Пароль',
         max_length=150,
         blank=False)
+    deleted = models.DateTimeField(
+        'Дата удаления', null=True, editable=False, db_index=True)
 
     class Meta:
         ordering = ('username',)
@@ -1,7 +1,254 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.functional import cached_property
+from foodgram.deletion import post_bulk_delete
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor, CursorPagination, PageNumberPagination,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_VERSION_KEY = 'pagination:count-version:{}'
+
+
+def get_count_cache():
+    options = settings.CACHED_COUNT
+    cache = caches[options['CACHE']]
+    if isinstance(cache, LocMemCache) and options['WORKERS'] > 1:
+        return None
+    return cache
+
+
+def get_tables(queryset):
+    query = queryset.query
+    return sorted({query.model._meta.db_table} | {
+        join.table_name for join in query.alias_map.values()})
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and len(query.alias_map) <= 1:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                (query.model._meta.db_table,))
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            estimate = cursor.fetchone()[0][0]['Plan']['Plan Rows']
+    return int(estimate) if estimate >= 0 else None
+
+
+class ExactCount:
+    counts = True
+
+    def count(self, queryset):
+        return queryset.count()
+
+
+class CachedCount(ExactCount):
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+
+    def get_key(self, cache, queryset):
+        tables = get_tables(queryset)
+        versions = cache.get_many(
+            [COUNT_VERSION_KEY.format(table) for table in tables])
+        sql, params = queryset.query.sql_with_params()
+        source = repr((sql, params, sorted(versions.items())))
+        return 'pagination:count:' + hashlib.md5(source.encode()).hexdigest()
+
+    def count(self, queryset):
+        cache = get_count_cache()
+        if cache is None:
+            return queryset.count()
+        return cache.get_or_set(
+            self.get_key(cache, queryset), queryset.count, self.timeout)
+
+
+class EstimatedCount(ExactCount):
+
+    def __init__(self, threshold=1000):
+        self.threshold = threshold
+
+    def count(self, queryset):
+        estimate = estimate_count(queryset)
+        if estimate is None or estimate < self.threshold:
+            return queryset.count()
+        return estimate
+
+
+class NoCount:
+    counts = False
+
+
+class Paginator(DjangoPaginator):
+
+    def __init__(self, *args, count_strategy=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_strategy = count_strategy or ExactCount()
+
+    @cached_property
+    def count(self):
+        return self.count_strategy.count(self.object_list)
+
+
+class EstimatedCountPaginator(Paginator):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, count_strategy=EstimatedCount(), **kwargs)
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 20
+    count_strategy = ExactCount()
+
+    def django_paginator_class(self, object_list, per_page):
+        return Paginator(
+            object_list, per_page, count_strategy=self.count_strategy)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_strategy = getattr(
+            view, 'pagination_count_strategy', self.count_strategy)
+        self.page = None
+        if self.count_strategy.counts:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_without_count(queryset, request)
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        bottom = (self.page_number - 1) * page_size
+        objects = list(queryset[bottom:bottom + page_size + 1])
+        if not objects and self.page_number != 1:
+            raise NotFound(self.invalid_page_message)
+        self.has_next = len(objects) > page_size
+        self.request = request
+        return objects[:page_size]
+
+    def get_next_link(self):
+        if self.page is not None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page is not None:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.page is not None:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('has_next', self.has_next),
+            ('results', data)
+        ]))
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 20
+
+    def __init__(self, field):
+        self.field = field
+        self.ordering = (f'-{field}', '-id')
+
+    def decode_position(self, position):
+        try:
+            score, pk = position.split(':')
+            return float(score), int(pk)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        queryset = queryset.annotate(keyset_position=F(self.field))
+        if reverse:
+            queryset = queryset.order_by(self.field, 'id')
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None:
+            score, pk = self.decode_position(self.cursor.position)
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': score})
+                | Q(**{self.field: score, f'id__{lookup}': pk}))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_position(self, instance):
+        return f'{instance.keyset_position!r}:{instance.id}'
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(0, False, self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(0, True, self.get_position(self.page[0])))
+
+
+def invalidate_cached_counts(sender, **kwargs):
+    cache = get_count_cache()
+    if cache is not None:
+        cache.set(COUNT_VERSION_KEY.format(sender._meta.db_table),
+                  uuid4().hex, None)
+
+
+def connect_cached_counts(*models):
+    for model in models:
+        for signal in (post_save, post_delete, m2m_changed, post_bulk_delete):
+            signal.connect(invalidate_cached_counts, sender=model)
@@ -1,9 +1,11 @@
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_base64.fields import Base64ImageField
+from foodgram.serialization import serialize_many
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 
 from .models import User
+from .subscriptions import is_subscribed
 from recipes.models import Recipe
 
 
@@ -17,10 +19,9 @@ class SpecialUserSerializer(UserSerializer):
             'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, author):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.follower.filter(author=author).exists()
+        if hasattr(author, 'is_subscribed'):
+            return author.is_subscribed
+        return is_subscribed(self.context.get('request'), author)
 
 
 class RecipeSubscriptionSerializer(serializers.ModelSerializer):
@@ -49,9 +50,7 @@ class SubscribeSerializer(SpecialUserSerializer):
         recipes = author.recipes.all()
         if limit:
             recipes = recipes[:int(limit)]
-        serializer = RecipeSubscriptionSerializer(
-            recipes, many=True, read_only=True)
-        return serializer.data
+        return serialize_many(RecipeSubscriptionSerializer, recipes)
 
     def validate(self, data):
         author = self.instance
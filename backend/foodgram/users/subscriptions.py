@@ -0,0 +1,24 @@
+def get_subscriptions(request):
+    subscriptions = getattr(request, '_subscriptions', None)
+    if subscriptions is None:
+        subscriptions = request._subscriptions = {}
+    return subscriptions
+
+
+def load_subscriptions(request, author_ids):
+    subscriptions = get_subscriptions(request)
+    missing = set(author_ids) - subscriptions.keys()
+    if not missing:
+        return subscriptions
+    user = request.user
+    subscribed = set()
+    if not user.is_anonymous:
+        subscribed = set(user.follower.filter(
+            author_id__in=missing).values_list('author_id', flat=True))
+    subscriptions.update(
+        (author_id, author_id in subscribed) for author_id in missing)
+    return subscriptions
+
+
+def is_subscribed(request, author):
+    return load_subscriptions(request, (author.id,))[author.id]
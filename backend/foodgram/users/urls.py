@@ -1,14 +1,25 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import SpecialUserViewSet
+from . import async_views
+from .views import SpecialUserViewSet, TokenCacheStatsView
 
 router_v1 = DefaultRouter()
 
 router_v1.register('users', SpecialUserViewSet)
 
-urlpatterns = [
+async_urlpatterns = [
+    path('users/', async_views.user_list),
+    path('users/subscriptions/', async_views.subscriptions),
+    path('users/<int:id>/', async_views.user_detail),
+]
+
+urlpatterns = async_urlpatterns if settings.ASYNC_READ_API else []
+
+urlpatterns += [
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
+    path('auth/token/cache/', TokenCacheStatsView.as_view()),
     path('auth/', include('djoser.urls.authtoken'))
 ]
@@ -1,25 +1,44 @@
 from django.contrib.auth import get_user_model
+from django.db.models import BooleanField, Exists, OuterRef, Value
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
+from foodgram.serialization import CompiledSerializerMixin, compile_serializer
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import (
-    IsAuthenticated, IsAuthenticatedOrReadOnly,
+    IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .authentication import token_cache
 from .models import Subscription
-from .pagination import LimitPageNumberPagination
+from .pagination import EstimatedCount, LimitPageNumberPagination
 from .serializers import SpecialUserSerializer, SubscribeSerializer
+from recipes.deletion import delete_users
+from recipes.throttling import ToggleThrottle
 
 User = get_user_model()
 
 
-class SpecialUserViewSet(UserViewSet):
+class SpecialUserViewSet(CompiledSerializerMixin, UserViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     queryset = User.objects.all()
     serializer = SpecialUserSerializer
     paginations_class = LimitPageNumberPagination
+    pagination_count_strategy = EstimatedCount()
+    compiled_actions = ('list', 'retrieve', 'me', 'subscriptions')
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(deleted__isnull=True)
+        user = self.request.user
+        if self.action not in ('list', 'retrieve') or user.is_anonymous:
+            return queryset
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))))
+
+    def perform_destroy(self, instance):
+        delete_users(User.objects.filter(pk=instance.pk))
 
     @action(
         detail=False,
@@ -27,21 +46,24 @@ class SpecialUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = User.objects.filter(
+            following__user=user, deleted__isnull=True).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()))
         pages = self.paginate_queryset(queryset)
-        serializer = SubscribeSerializer(
+        serializer = compile_serializer(SubscribeSerializer(
             pages, many=True,
-            context={'request': request})
+            context={'request': request}))
         return self.get_paginated_response(serializer.data)
 
     @action(
         detail=True,
         methods=('post', 'delete'),
-        permission_classes=(IsAuthenticated,))
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,))
     def subscribe(self, request, **kwargs):
         user = request.user
         author_id = self.kwargs.get('id')
-        author = get_object_or_404(User, id=author_id)
+        author = get_object_or_404(User, id=author_id, deleted__isnull=True)
         if request.method == 'POST':
             serializer = SubscribeSerializer(
                 author,
@@ -57,3 +79,10 @@ class SpecialUserViewSet(UserViewSet):
             subscription.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class TokenCacheStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(token_cache.stats())